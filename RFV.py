@@ -1,48 +1,48 @@
+import argparse
+from pathlib import Path
+
 import pandas as pd
-import numpy as np
+
+from agregacao_particionada import gravar_parquet
+from escritor_xlsx import gravar_xlsx
+from esquema import normalizar_tipos
+from leitor_xlsx import ler_xlsx
+from rfv_incremental import COLUNAS_RFV_INCREMENTAL, RFVIncremental, abrir_rfv_incremental
+from snapshot_dados import carregar_snapshot
 
 # Caminho do arquivo
 file_path = "H:/Meu Drive/Kidy/PREDITIVA/DADOS/DADOS_PREDITIVA.xlsx"
 
-# Carregar somente as colunas necessárias para o cálculo do RFV
-colunas_rfv = ["Codigo Cliente", "Data Ultima Compra", "Numero Pedido", "Vlr Venda"]
-df = pd.read_excel(file_path, sheet_name="DADOS_PREDITIVA", usecols=colunas_rfv, parse_dates=["Data Ultima Compra"])
-
-# Garantir que o código do cliente seja string
-df["Codigo Cliente"] = df["Codigo Cliente"].astype(str)
-
-# Agrupar os dados para RFV
-rfv = df.groupby("Codigo Cliente").agg({
-    "Data Ultima Compra": lambda x: (pd.Timestamp.today() - x.max()).days,
-    "Numero Pedido": "count",
-    "Vlr Venda": "sum"
-}).rename(columns={
-    "Data Ultima Compra": "Recencia",
-    "Numero Pedido": "Frequencia",
-    "Vlr Venda": "Valor"
-})
-
-# Quantis para RFV
-rfv["R_quantil"] = pd.qcut(rfv["Recencia"], 5, labels=[5, 4, 3, 2, 1]).astype(int)
-rfv["F_quantil"] = pd.qcut(rfv["Frequencia"].rank(method="first"), 5, labels=[1, 2, 3, 4, 5]).astype(int)
-rfv["V_quantil"] = pd.qcut(rfv["Valor"].rank(method="first"), 5, labels=[1, 2, 3, 4, 5]).astype(int)
-
-# RFV Score
-rfv["RFV_Score"] = rfv["R_quantil"].astype(str) + rfv["F_quantil"].astype(str) + rfv["V_quantil"].astype(str)
-
-# Classificação de Segmento
-def classificar(score):
-    total = sum(int(d) for d in score)
-    if total >= 13:
-        return "Cliente Premium"
-    elif total >= 10:
-        return "Cliente Valioso"
-    elif total >= 7:
-        return "Cliente Médio"
-    else:
-        return "Cliente em Risco"
-
-rfv["Segmento"] = rfv["RFV_Score"].apply(classificar)
-
-# Exportar para Excel
-rfv.reset_index().to_excel("RFV_CLIENTES.xlsx", index=False)
+parser = argparse.ArgumentParser(description="Exporta o RFV dos clientes para RFV_CLIENTES.xlsx e .parquet")
+parser.add_argument("--incremental", nargs="+", metavar="ARQUIVO",
+                    help="aplica só os pedidos destas exportações ao RFV salvo, sem reler a base")
+args = parser.parse_args()
+hoje = pd.Timestamp.today()
+
+if args.incremental:
+    # Pedidos novos ou corrigidos reagregam só os seus clientes; as notas da base
+    # inteira só são refeitas quando os cortes dos quintis se deslocam (rfv_incremental.py)
+    rfv = abrir_rfv_incremental()
+    if rfv.cortes is None:
+        parser.error("nenhum RFV salvo: rode o RFV.py sem --incremental uma vez")
+    for arquivo in args.incremental:
+        resumo = rfv.aplicar(normalizar_tipos(ler_xlsx(arquivo, colunas=COLUNAS_RFV_INCREMENTAL)), hoje)
+        print(f"{arquivo}: {resumo['pedidos']} pedidos, {resumo['clientes']} clientes"
+              f"{', base renotada' if resumo['reclassificado'] else ''}")
+else:
+    # Só as quatro colunas do RFV, lidas do snapshot Parquet (snapshot_dados.py): a planilha
+    # grande só é convertida de novo quando muda
+    df = carregar_snapshot(file_path, sheet_name="DADOS_PREDITIVA", colunas=COLUNAS_RFV_INCREMENTAL)
+
+    # Recência, frequência e valor por cliente; notas por quintis e segmento pela soma das notas,
+    # tudo vetorizado no motor_rfv (o mesmo usado pelos dashboards)
+    rfv = RFVIncremental()
+    rfv.aplicar(df, hoje)
+
+# Estado salvo em .resumos para a próxima execução incremental
+rfv.salvar()
+
+# Exportar para Excel em streaming e, ao lado, o mesmo conteúdo em Parquet
+tabela = rfv.tabela(hoje).rename_axis("Codigo Cliente").reset_index()
+gravar_xlsx(tabela, Path("RFV_CLIENTES.xlsx"))
+gravar_parquet(tabela, Path("RFV_CLIENTES.parquet"))
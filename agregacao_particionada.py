@@ -0,0 +1,163 @@
+import argparse
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from colunas_derivadas import COLUNAS_DERIVADAS, completar_derivadas
+from ingestao import PARTICIONAMENTO, PASTA_BASE, PASTA_DATASET, filtro_particoes
+from motor_rfv import pontuar_faixas, score_rfv
+
+# RESUMOS DO HISTÓRICO COMPLETO (gerados fora da memória, lidos pelos apps)
+PASTA_RESUMOS = PASTA_BASE / ".resumos"
+
+COLUNAS_HISTORICO = [
+    'Codigo Grupo Cliente', 'Codigo Cliente', 'Numero Pedido', 'Data Cadastro',
+    'Data Ultima Compra', 'Qtd Venda', 'Vlr Venda', 'Preço Médio Produto', 'Codigo Colecao', 'Colecao',
+]
+
+# Como cada medida parcial se combina com outra
+COMBINACAO_KPIS = {
+    'Qtd Venda': 'sum',
+    'Vlr Venda': 'sum',
+    'Linhas': 'sum',
+    'SomaPreco': 'sum',
+    # Um pedido tem uma só data e um só supervisor: nunca aparece em duas partições
+    'Pedidos': 'sum',
+    'Primeira Data': 'min',
+    'Ultima Data': 'max',
+    'Ultima Compra': 'max',
+}
+# O rótulo acompanha o código da coleção, que é o que dá a ordem cronológica
+COMBINACAO_COLECOES = {'Colecao': 'first', 'Qtd Venda': 'sum', 'Vlr Venda': 'sum'}
+
+
+# LEITURA PARTIÇÃO A PARTIÇÃO
+def iterar_particoes(pasta=PASTA_DATASET, colunas=COLUNAS_HISTORICO, supervisores=None, anos=None, filtro=None):
+    """Devolve uma partição (supervisor, ano) por vez, só com as colunas pedidas.
+
+    O pico de memória é o da maior partição, não o do histórico inteiro.
+    """
+    dataset = ds.dataset(pasta, format='parquet', partitioning=PARTICIONAMENTO)
+    filtro_total = filtro_particoes(supervisores, anos)
+    if filtro is not None:
+        filtro_total = filtro if filtro_total is None else filtro_total & filtro
+
+    # Derivada que a base ainda não grava é calculada na leitura, a partir das suas dependências
+    lidas = list(colunas)
+    for nome, dependencias, _, _ in reversed(COLUNAS_DERIVADAS):
+        if nome in lidas and nome not in dataset.schema.names:
+            lidas += [d for d in dependencias if d not in lidas]
+    lidas = [c for c in lidas if c in dataset.schema.names]
+
+    for fragmento in dataset.get_fragments(filter=filtro_total):
+        tabela = fragmento.to_table(schema=dataset.schema, columns=lidas, filter=filtro_total)
+        if tabela.num_rows:
+            linhas = tabela.to_pandas()
+            yield linhas if lidas == list(colunas) else completar_derivadas(linhas)[list(colunas)]
+
+
+# PARCIAIS COMBINÁVEIS
+def parcial_kpis(linhas, chave):
+    grupos = linhas.groupby(chave, observed=True)
+    return pd.DataFrame({
+        'Qtd Venda': grupos['Qtd Venda'].sum(),
+        'Vlr Venda': grupos['Vlr Venda'].sum(),
+        'Linhas': grupos.size(),
+        'SomaPreco': grupos['Preço Médio Produto'].sum(),
+        'Pedidos': grupos['Numero Pedido'].nunique(),
+        'Primeira Data': grupos['Data Cadastro'].min(),
+        'Ultima Data': grupos['Data Cadastro'].max(),
+        'Ultima Compra': grupos['Data Ultima Compra'].max(),
+    })
+
+
+def parcial_datas(linhas, chave):
+    # Dias distintos com pedido (a frequência do RFV); o mesmo dia pode vir de dois supervisores
+    return linhas[[chave, 'Data Cadastro']].dropna().drop_duplicates()
+
+
+def parcial_colecoes(linhas, chave):
+    return linhas.groupby([chave, 'Codigo Colecao'], observed=True).agg(COMBINACAO_COLECOES)
+
+
+def combinar_kpis(a, b):
+    if a is None:
+        return b
+    return pd.concat([a, b]).groupby(level=0).agg(COMBINACAO_KPIS)
+
+
+def combinar_datas(a, b):
+    return b if a is None else pd.concat([a, b], ignore_index=True).drop_duplicates()
+
+
+def combinar_colecoes(a, b):
+    return b if a is None else pd.concat([a, b]).groupby(level=[0, 1]).agg(COMBINACAO_COLECOES)
+
+
+# EXECUÇÃO FORA DA MEMÓRIA
+def agregar_historico(pasta=PASTA_DATASET, chave='Codigo Cliente', supervisores=None, anos=None, hoje=None):
+    """KPIs, RFV e totais por coleção de todo o histórico, por `chave` (cliente ou grupo).
+
+    Lê uma partição por vez e a combina com o acumulado; a memória fica limitada
+    ao tamanho de uma partição mais o dos resultados (uma linha por chave).
+    """
+    kpis = datas = colecoes = None
+    for linhas in iterar_particoes(pasta, supervisores=supervisores, anos=anos):
+        kpis = combinar_kpis(kpis, parcial_kpis(linhas, chave))
+        datas = combinar_datas(datas, parcial_datas(linhas, chave))
+        colecoes = combinar_colecoes(colecoes, parcial_colecoes(linhas, chave))
+
+    if kpis is None:
+        raise ValueError(f"Nenhuma partição encontrada em {pasta}")
+
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today()).normalize()
+    kpis['Frequencia'] = datas.groupby(chave, observed=True).size().reindex(kpis.index, fill_value=0)
+    kpis['Preço Médio Produto'] = kpis['SomaPreco'] / kpis['Linhas']
+    kpis['Recencia'] = (hoje - kpis['Ultima Compra']).dt.days.fillna(999).astype('int64')
+
+    # Mesmas faixas de calcular_rfv_individual
+    r, f, v, classificacao = pontuar_faixas(kpis['Recencia'].to_numpy(), kpis['Frequencia'].to_numpy(), kpis['Vlr Venda'].to_numpy())
+    kpis['RFV Score'] = score_rfv(r, f, v).astype(str)
+    kpis['Classificação'] = classificacao
+
+    return kpis.reset_index(), colecoes.sort_index().reset_index()
+
+
+def gravar_parquet(df, caminho):
+    # Grava ao lado e troca de uma vez: quem lê nunca vê o arquivo pela metade
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def gerar_resumos(pasta=PASTA_DATASET, destino=PASTA_RESUMOS, hoje=None):
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    gerados = []
+    for chave, nome in [('Codigo Cliente', 'clientes'), ('Codigo Grupo Cliente', 'grupos')]:
+        kpis, colecoes = agregar_historico(pasta, chave=chave, hoje=hoje)
+        gravar_parquet(kpis, destino / f"historico_{nome}.parquet")
+        gravar_parquet(colecoes, destino / f"colecoes_{nome}.parquet")
+        gerados.append((nome, len(kpis)))
+    return gerados
+
+
+def carregar_resumo(codigo, tipo='clientes', pasta=PASTA_RESUMOS):
+    """Linha de KPIs/RFV do histórico completo e os totais por coleção de um cliente ou grupo."""
+    chave = 'Codigo Cliente' if tipo == 'clientes' else 'Codigo Grupo Cliente'
+    filtro = ds.field(chave) == str(codigo)
+    kpis = ds.dataset(Path(pasta) / f"historico_{tipo}.parquet").to_table(filter=filtro).to_pandas()
+    colecoes = ds.dataset(Path(pasta) / f"colecoes_{tipo}.parquet").to_table(filter=filtro).to_pandas()
+    return kpis, colecoes.sort_values('Codigo Colecao', ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os resumos do histórico completo, partição a partição")
+    parser.add_argument("--dataset", default=str(PASTA_DATASET))
+    parser.add_argument("--destino", default=str(PASTA_RESUMOS))
+    args = parser.parse_args()
+
+    for nome, linhas in gerar_resumos(args.dataset, args.destino):
+        print(f"{nome}: {linhas} linhas")
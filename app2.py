@@ -1,11 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from datetime import datetime
 from fpdf import FPDF
 import tempfile
 import os
 from PIL import Image
+from snapshot_dados import carregar_snapshot
+from rankings import top_k
 
 # ✅ Adiciona CSS Customizado
 def add_custom_css():
@@ -65,12 +68,8 @@ meses_portugues = {
 @st.cache_resource(ttl=3600)
 def carregar_dados_processados():
     file_path = r"C:/Kidy/PREDITIVA/DADOS_PREDITIVA.xlsx"
-    df = pd.read_excel(file_path, sheet_name='DADOS PREDITIVA')
-    df['Codigo Grupo Cliente'] = df['Codigo Grupo Cliente'].astype(str).str.upper()
-    df['Codigo Cliente'] = df['Codigo Cliente'].astype(str).str.upper()
-    df['Data Cadastro'] = pd.to_datetime(df['Data Cadastro'], errors='coerce')
-    df['Data Ultima Compra'] = pd.to_datetime(df['Data Ultima Compra'], errors='coerce')
-    return df
+    # Tipos e colunas derivadas (Mes Pedido, Semestre, Ano, SemestreNum) já vêm do snapshot
+    return carregar_snapshot(file_path, sheet_name='DADOS PREDITIVA')
 
 # ✅ Geração de PDF
 def gerar_pdf(nome_grupo, ultima_compra, periodo_analise, melhor_mes_nome, vendas_totais, tabela_top_linhas, top_produtos):
@@ -172,16 +171,11 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                     total_pedidos = dados_filtrados['Data Cadastro'].nunique()
                     ticket_medio = vendas_totais / total_pedidos if total_pedidos else 0
 
-                    dados_filtrados['Mes Pedido'] = dados_filtrados['Data Cadastro'].dt.month
                     melhor_mes_num = dados_filtrados['Mes Pedido'].mode()[0]
                     melhor_mes_nome = meses_portugues.get(melhor_mes_num, 'Mês inválido')
 
-                    dados_filtrados['Semestre'] = dados_filtrados['Data Cadastro'].dt.month.apply(lambda x: '1º Semestre' if x <= 6 else '2º Semestre')
-
-                    vendas_semestre = dados_filtrados.groupby(['Linha', 'Semestre'])['Qtd Venda'].sum().unstack(fill_value=0).reset_index()
-                    total_vendas_linha = dados_filtrados.groupby('Linha')['Qtd Venda'].sum().reset_index(name='Quantidade Vendida Total')
-                    top_linhas = pd.merge(total_vendas_linha, vendas_semestre, on='Linha')
-                    top_linhas = top_linhas.sort_values(by='Quantidade Vendida Total', ascending=False).head(10)
+                    # Top 10 por seleção parcial sobre as somas por linha
+                    top_linhas = top_k(dados_filtrados, 'Linha').rename(columns={'Qtd Venda': 'Quantidade Vendida Total'})
 
                     st.subheader(f"📌 Grupo Cliente: {nome_grupo}")
                     col1, col2, col3 = st.columns(3)
@@ -197,14 +191,13 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                             top_linhas[['Linha', 'Quantidade Vendida Total']].rename(columns={'Quantidade Vendida Total': 'Quantidade Vendida'})
                         )
 
-                    dados_filtrados['Ano'] = dados_filtrados['Data Cadastro'].dt.year
-                    dados_filtrados['SemestreNum'] = dados_filtrados['Data Cadastro'].dt.month.apply(lambda x: 1 if x <= 6 else 2)
-
-                    ultimos_periodos = dados_filtrados[['Ano', 'SemestreNum']].drop_duplicates().sort_values(['Ano', 'SemestreNum'], ascending=[False, False]).head(2)
-
-                    filtro_semestres = pd.merge(dados_filtrados, ultimos_periodos, how='inner', on=['Ano', 'SemestreNum'])
+                    # Dois últimos semestres com venda, por um código inteiro (ano × 2 + semestre)
+                    semestres = (dados_filtrados['Ano'].to_numpy(dtype='float64') * 2
+                                 + dados_filtrados['SemestreNum'].to_numpy(dtype='float64'))
+                    ultimos_semestres = np.unique(semestres[~np.isnan(semestres)])[-2:]
+                    filtro_semestres = dados_filtrados[np.isin(semestres, ultimos_semestres)]
 
-                    top_produtos = filtro_semestres.groupby('Referencia')['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
+                    top_produtos = top_k(filtro_semestres, 'Referencia')
 
                     # ✅ Renomeia colunas para manter consistência visual
                     top_produtos_renomeado = top_produtos.rename(columns={
@@ -6,6 +6,17 @@ from fpdf import FPDF
 import tempfile
 import os
 from PIL import Image
+from ingestao import ARQUIVO_MARCAS, PASTA_DATASET
+from agregacao_particionada import PASTA_RESUMOS, carregar_resumo
+from crescimento import meses_crescimento, placar_crescimento
+from rfv_historico import meses_migracao, migracao_do_mes
+from snapshot_dados import assinatura_arquivo
+from atualizacao import AtualizadorDados
+from indice_clientes import IndiceClientes
+from busca_clientes import BuscaClientes
+from componentes_dashboard import cartoes_rfv, filtro_cliente_grupo
+from motor_rfv import TabelaRFV
+from dados_compartilhados import dataset_compartilhado, snapshot_compartilhado
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
@@ -89,56 +100,41 @@ meses_portugues = {
 }
 
 # FUNÇÃO PARA CARREGAR DADOS
-@st.cache_resource(ttl=3600)
-def carregar_dados_processados():
-    try:
-        file_path = r"H:/Meu Drive/Kidy/PREDITIVA/DADOS/DADOS_PREDITIVA.xlsx"
-        df = pd.read_excel(file_path, sheet_name='DADOS_PREDITIVA')
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
-
-    df['Codigo Grupo Cliente'] = df['Codigo Grupo Cliente'].astype(str).str.upper()
-    df['Codigo Cliente'] = df['Codigo Cliente'].astype(str).str.upper()
-    df['Data Cadastro'] = pd.to_datetime(df['Data Cadastro'], errors='coerce')
-    df['Data Ultima Compra'] = pd.to_datetime(df['Data Ultima Compra'], errors='coerce')
-    df['Preço Médio Produto'] = df.apply(lambda row: row['Vlr Venda'] / row['Qtd Venda'] if row['Qtd Venda'] > 0 else 0, axis=1)
-    return df
+file_path = r"H:/Meu Drive/Kidy/PREDITIVA/DADOS/DADOS_PREDITIVA.xlsx"
 
+def carregar_dados_processados():
+    # Dataset gerado por `python ingestao.py` (todos os supervisores); senão, a planilha única
+    if PASTA_DATASET.exists():
+        df = dataset_compartilhado()
+    else:
+        df = snapshot_compartilhado(file_path, sheet_name='DADOS_PREDITIVA')
 
-# RFV SCORE
-def calcular_rfv_individual(dados_filtrados):
-    hoje = datetime.today()
+    # Já tipado e com as colunas derivadas; somente leitura
+    return df
 
-    recencia = (hoje - dados_filtrados['Data Ultima Compra'].max()).days if pd.notnull(dados_filtrados['Data Ultima Compra'].max()) else 999
-    frequencia = dados_filtrados['Data Cadastro'].nunique()
-    valor = dados_filtrados['Vlr Venda'].sum()
+def assinatura_fonte():
+    if PASTA_DATASET.exists():
+        return assinatura_arquivo(PASTA_DATASET / ARQUIVO_MARCAS)
+    return assinatura_arquivo(file_path)
 
-    recencia_score = 5 if recencia <= 30 else 4 if recencia <= 90 else 3 if recencia <= 180 else 2 if recencia <= 365 else 1
-    frequencia_score = 5 if frequencia >= 12 else 4 if frequencia >= 6 else 3 if frequencia >= 3 else 2 if frequencia >= 1 else 1
-    valor_score = 5 if valor >= 50000 else 4 if valor >= 20000 else 3 if valor >= 10000 else 2 if valor >= 5000 else 1
+def preparar_dados():
+    # Índice, busca e RFV montados uma vez por versão dos dados
+    indice = IndiceClientes(carregar_dados_processados())
+    return indice, BuscaClientes(indice.dados), TabelaRFV(indice.dados)
 
-    rfv_score = f"{recencia_score}{frequencia_score}{valor_score}"
+@st.cache_resource
+def atualizador_dados():
+    # Um por processo; recarrega em segundo plano após 1h ou se a fonte mudar
+    return AtualizadorDados(preparar_dados, ttl=3600, assinatura=assinatura_fonte)
 
-    if rfv_score == '555':
-        classificacao = 'Cliente VIP'
-    elif recencia_score >= 4 and frequencia_score >= 4:
-        classificacao = 'Cliente Leal'
-    elif recencia_score >= 3:
-        classificacao = 'Cliente Potencial'
-    else:
-        classificacao = 'Cliente em Risco'
-
-    return {
-        'Recência (dias)': recencia,
-        'Frequência (pedidos únicos)': frequencia,
-        'Valor Total (R$)': f"{valor:,.2f}",
-        'RFV Score': rfv_score,
-        'Classificação': classificacao
-    }
 
 # CARREGA DADOS
-df = carregar_dados_processados()
+try:
+    indice, busca, tabela_rfv = atualizador_dados().obter()
+    df = indice.dados
+except Exception as e:
+    st.error(f"Erro ao carregar dados: {e}")
+    df = pd.DataFrame()
 
 if df.empty:
     st.stop()
@@ -148,8 +144,7 @@ st.title("📊 Dashboard Analítico")
 st.sidebar.image(logo_kidy, width=100)
 st.sidebar.header("🔧 Filtros de Análise")
 
-codigo_grupo_cliente = st.sidebar.text_input("Código do Grupo de Cliente (Opcional):").strip().upper()
-codigo_cliente = st.sidebar.text_input("Código do Cliente (Opcional):").strip().upper()
+codigo_grupo_cliente, codigo_cliente = filtro_cliente_grupo(busca)
 
 data_min = df['Data Cadastro'].min().date()
 data_max = df['Data Cadastro'].max().date()
@@ -169,41 +164,41 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
     else:
         with st.spinner('🔎 Analisando dados...'):
 
-            dados_filtrados = df.copy()
-
-            if codigo_cliente:
-                dados_filtrados = dados_filtrados[dados_filtrados['Codigo Cliente'] == codigo_cliente]
-            elif codigo_grupo_cliente:
-                dados_filtrados = dados_filtrados[dados_filtrados['Codigo Grupo Cliente'] == codigo_grupo_cliente]
-
-            dados_filtrados = dados_filtrados[
-                (dados_filtrados['Data Cadastro'] >= pd.to_datetime(periodo[0])) &
-                (dados_filtrados['Data Cadastro'] <= pd.to_datetime(periodo[1]))
-            ]
+            # Fatia pelo índice (busca binária no cliente/grupo e no período), sem copiar a base
+            dados_filtrados = indice.fatia(
+                codigo_cliente=codigo_cliente,
+                codigo_grupo=codigo_grupo_cliente,
+                inicio=pd.to_datetime(periodo[0]),
+                fim=pd.to_datetime(periodo[1]),
+            )
 
             if dados_filtrados.empty:
                 st.warning("⚠️ Nenhum dado encontrado no período!")
             else:
-                dados_filtrados['Ano'] = dados_filtrados['Data Cadastro'].dt.year
                 nome_grupo = dados_filtrados['Grupo Cliente'].iloc[0]
                 total_lojas = dados_filtrados['Codigo Cliente'].nunique()
 
                 st.markdown(f"## 📍 Grupo Cliente: {nome_grupo} | 🏬 Lojas: {total_lojas}")
 
-                rfv_resultado = calcular_rfv_individual(dados_filtrados)
-                colrfv1, colrfv2, colrfv3, colrfv4, colrfv5 = st.columns(5)
-
-                for col, label, value in zip(
-                    [colrfv1, colrfv2, colrfv3, colrfv4, colrfv5],
-                    ['Recência (dias)', 'Frequência', 'Valor Total (R$)', 'RFV Score', 'Classificação'],
-                    [rfv_resultado['Recência (dias)'], rfv_resultado['Frequência (pedidos únicos)'], rfv_resultado['Valor Total (R$)'], rfv_resultado['RFV Score'], rfv_resultado['Classificação']]
-                ):
-                    col.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">{label}</div>
-                            <div class="metric-value">{value}</div>
-                        </div>
-                    """, unsafe_allow_html=True)
+                rfv_resultado = tabela_rfv.cartao(codigo_cliente, codigo_grupo_cliente)
+                cartoes_rfv(rfv_resultado)
+
+                # HISTÓRICO COMPLETO: resumos gerados fora da memória por `python agregacao_particionada.py`
+                if PASTA_RESUMOS.exists():
+                    tipo, codigo = ('clientes', codigo_cliente) if codigo_cliente else ('grupos', codigo_grupo_cliente)
+                    historico, colecoes_historico = carregar_resumo(codigo, tipo)
+                    if not historico.empty:
+                        h = historico.iloc[0]
+                        with st.expander("📚 Histórico completo (todos os supervisores e anos)"):
+                            st.markdown(
+                                f"**RFV {h['RFV Score']} - {h['Classificação']}** | Recência: {h['Recencia']} dias | "
+                                f"Frequência: {h['Frequencia']} | Valor Total: R$ {h['Vlr Venda']:,.2f}"
+                            )
+                            st.markdown(
+                                f"Pedidos: {h['Pedidos']} | Pares: {h['Qtd Venda']:,} | "
+                                f"De {h['Primeira Data'].strftime('%d/%m/%Y')} a {h['Ultima Data'].strftime('%d/%m/%Y')}"
+                            )
+                            st.table(colecoes_historico[['Colecao', 'Qtd Venda', 'Vlr Venda']])
 
                 # KPIs
                 ultima_data_compra = dados_filtrados['Data Ultima Compra'].max()
@@ -233,7 +228,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 st.success(f"📦 Total de Itens Vendidos: {vendas_totais:,} unidades")
 
                 # TOP 10 LINHAS
-                total_vendas_linha = dados_filtrados.groupby(['Codigo Linha', 'Linha'])['Qtd Venda'].sum().reset_index(name='Quantidade Vendida')
+                total_vendas_linha = dados_filtrados.groupby(['Codigo Linha', 'Linha'], observed=True)['Qtd Venda'].sum().reset_index(name='Quantidade Vendida')
                 top_linhas = total_vendas_linha.sort_values(by='Quantidade Vendida', ascending=False).head(10)
 
                 st.markdown("👉 **🔮 Top 10 Linhas Preditivas para Ofertar:**")
@@ -254,9 +249,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 st.subheader("🤖 Previsão de Linhas para Oferta (Machine Learning)")
                 progress_bar = st.progress(0)
 
-                dados_ml = df.copy()
-                dados_ml['Mes Pedido'] = dados_ml['Data Cadastro'].dt.month
-                dados_ml['Compra'] = dados_ml['Qtd Venda'].apply(lambda x: 1 if x > 0 else 0)
+                dados_ml = df[['Codigo Grupo Cliente', 'Codigo Cliente', 'Linha', 'Mes Pedido', 'Compra']].copy()
 
                 le_grupo = LabelEncoder().fit(dados_ml['Codigo Grupo Cliente'])
                 le_cliente = LabelEncoder().fit(dados_ml['Codigo Cliente'])
@@ -306,7 +299,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 fig3 = px.bar(dados_filtrados.groupby('Ano')['Preço Médio Produto'].mean().reset_index(), x='Ano', y='Preço Médio Produto', color='Ano', text='Preço Médio Produto', title="💰 Preço Médio dos Produtos por Ano")
                 fig4 = px.bar(dados_filtrados.groupby('Ano')['Vlr Venda'].sum().reset_index(), x='Ano', y='Vlr Venda', color='Ano', text='Vlr Venda', title="💸 Valores Vendidos por Ano")
 
-                top10_periodo = dados_filtrados.groupby('Linha')['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
+                top10_periodo = dados_filtrados.groupby('Linha', observed=True)['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
                 fig5 = px.bar(top10_periodo, x='Linha', y='Qtd Venda', color='Linha', text='Qtd Venda', title="🏆 Top 10 Linhas Mais Vendidas no Período")
 
                 for fig in [fig1, fig2, fig3, fig4, fig5]:
@@ -380,8 +373,11 @@ if st.session_state.get("pdf_ready", False):
             pdf.set_font("Arial", "B", 14)
             pdf.cell(0, 10, "Métricas RFV", ln=True)
             pdf.set_font("Arial", size=12)
-            for key, val in st.session_state['rfv_resultado'].items():
-                pdf.cell(0, 10, f"{key}: {val}", ln=True)
+            if st.session_state['rfv_resultado'] is None:
+                pdf.cell(0, 10, "RFV indisponível", ln=True)
+            else:
+                for key, val in st.session_state['rfv_resultado'].items():
+                    pdf.cell(0, 10, f"{key}: {val}", ln=True)
             pdf.ln(10)
 
             pdf.set_font("Arial", "B", 14)
@@ -424,7 +420,39 @@ if st.session_state.get("pdf_ready", False):
                 )
 
             st.success("✅ Relatório gerado com sucesso!")
-                
+
+# CRESCIMENTO DE TODOS OS GRUPOS E CLIENTES: visão gerada por `python crescimento.py`
+if (PASTA_RESUMOS / "crescimento_grupos.parquet").exists():
+    with st.expander("📈 Ranking de crescimento (todos os grupos e clientes)"):
+        col1, col2, col3, col4 = st.columns(4)
+        tipo_placar = col1.radio("Ver:", ['grupos', 'clientes'], format_func=str.capitalize, horizontal=True)
+        mes_placar = col2.selectbox(
+            "Mês:", meses_crescimento(tipo_placar), format_func=lambda m: f"{meses_portugues[m.month]}/{m.year}"
+        )
+        metrica_placar = col3.selectbox("Métrica:", [
+            'Δ Valor YoY', 'Valor YoY %', 'Δ Valor MoM', 'Valor MoM %',
+            'Δ Pares YoY', 'Pares YoY %', 'Δ Pares MoM', 'Pares MoM %',
+            'Δ Pedidos YoY', 'Pedidos YoY %', 'Δ Pedidos MoM', 'Pedidos MoM %',
+        ])
+        crescente = col4.radio("Ordem:", ['Maiores altas', 'Maiores quedas'], horizontal=True) == 'Maiores quedas'
+
+        placar = placar_crescimento(mes_placar, tipo_placar, metrica_placar, quantidade=50, crescente=crescente)
+        medida = metrica_placar.split()[1] if metrica_placar.startswith('Δ') else metrica_placar.split()[0]
+        colunas_placar = list(placar.columns[:2]) + [
+            medida, f'{medida} Mês Anterior', f'{medida} MoM %', f'{medida} Ano Anterior', f'{medida} YoY %', metrica_placar
+        ]
+        # st.dataframe permite reordenar por qualquer coluna clicando no cabeçalho
+        st.dataframe(placar[list(dict.fromkeys(colunas_placar))], use_container_width=True, hide_index=True)
+
+# MIGRAÇÃO ENTRE SEGMENTOS RFV: visão gerada por `python rfv_historico.py`
+if (PASTA_RESUMOS / "rfv_migracoes.parquet").exists():
+    with st.expander("🔀 Migração entre segmentos RFV (todos os clientes)"):
+        mes_migracao = st.selectbox(
+            "Mês:", meses_migracao(), format_func=lambda m: f"{meses_portugues[m.month]}/{m.year}", key='mes_migracao'
+        )
+        st.caption("Linhas: segmento no fim do mês anterior. Colunas: segmento no fim do mês escolhido.")
+        st.dataframe(migracao_do_mes(mes_migracao), use_container_width=True)
+
 # RODAPÉ
 st.sidebar.markdown("---")
 st.sidebar.caption(f"Relatório gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
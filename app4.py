@@ -6,6 +6,7 @@ from fpdf import FPDF
 import tempfile
 import os
 from PIL import Image
+from snapshot_dados import carregar_snapshot
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
@@ -87,16 +88,12 @@ meses_portugues = {
 def carregar_dados_processados():
     try:
         file_path = r"C:/Kidy/PREDITIVA/DADOS_PREDITIVA.xlsx"
-        df = pd.read_excel(file_path, sheet_name='DADOS PREDITIVA')
+        df = carregar_snapshot(file_path, sheet_name='DADOS PREDITIVA')
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
 
-    df['Codigo Grupo Cliente'] = df['Codigo Grupo Cliente'].astype(str).str.upper()
-    df['Codigo Cliente'] = df['Codigo Cliente'].astype(str).str.upper()
-    df['Data Cadastro'] = pd.to_datetime(df['Data Cadastro'], errors='coerce')
-    df['Data Ultima Compra'] = pd.to_datetime(df['Data Ultima Compra'], errors='coerce')
-    df['Preço Médio Produto'] = df.apply(lambda row: row['Vlr Venda'] / row['Qtd Venda'] if row['Qtd Venda'] > 0 else 0, axis=1)
+    # Já tipado e com as colunas derivadas
     return df
 
 # RFV SCORE
@@ -177,7 +174,6 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
             if dados_filtrados.empty:
                 st.warning("⚠️ Nenhum dado encontrado no período!")
             else:
-                dados_filtrados['Ano'] = dados_filtrados['Data Cadastro'].dt.year
                 nome_grupo = dados_filtrados['Grupo Cliente'].iloc[0]
                 total_lojas = dados_filtrados['Codigo Cliente'].nunique()
 
@@ -226,7 +222,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 st.success(f"📦 Total de Itens Vendidos: {vendas_totais:,} unidades")
 
                 # TOP 10 LINHAS
-                total_vendas_linha = dados_filtrados.groupby(['Codigo Linha', 'Linha'])['Qtd Venda'].sum().reset_index(name='Quantidade Vendida')
+                total_vendas_linha = dados_filtrados.groupby(['Codigo Linha', 'Linha'], observed=True)['Qtd Venda'].sum().reset_index(name='Quantidade Vendida')
                 top_linhas = total_vendas_linha.sort_values(by='Quantidade Vendida', ascending=False).head(10)
 
                 st.markdown("👉 **🔮 Top 10 Linhas Preditivas para Ofertar:**")
@@ -247,9 +243,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 st.subheader("🤖 Previsão de Linhas para Oferta (Machine Learning)")
                 progress_bar = st.progress(0)
 
-                dados_ml = df.copy()
-                dados_ml['Mes Pedido'] = dados_ml['Data Cadastro'].dt.month
-                dados_ml['Compra'] = dados_ml['Qtd Venda'].apply(lambda x: 1 if x > 0 else 0)
+                dados_ml = df[['Codigo Grupo Cliente', 'Codigo Cliente', 'Linha', 'Mes Pedido', 'Compra']].copy()
 
                 le_grupo = LabelEncoder().fit(dados_ml['Codigo Grupo Cliente'])
                 le_cliente = LabelEncoder().fit(dados_ml['Codigo Cliente'])
@@ -299,7 +293,7 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                 fig3 = px.bar(dados_filtrados.groupby('Ano')['Preço Médio Produto'].mean().reset_index(), x='Ano', y='Preço Médio Produto', color='Ano', text='Preço Médio Produto', title="💰 Preço Médio dos Produtos por Ano")
                 fig4 = px.bar(dados_filtrados.groupby('Ano')['Vlr Venda'].sum().reset_index(), x='Ano', y='Vlr Venda', color='Ano', text='Vlr Venda', title="💸 Valores Vendidos por Ano")
 
-                top10_periodo = dados_filtrados.groupby('Linha')['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
+                top10_periodo = dados_filtrados.groupby('Linha', observed=True)['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
                 fig5 = px.bar(top10_periodo, x='Linha', y='Qtd Venda', color='Linha', text='Qtd Venda', title="🏆 Top 10 Linhas Mais Vendidas no Período")
 
                 for fig in [fig1, fig2, fig3, fig4, fig5]:
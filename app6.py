@@ -6,6 +6,23 @@ from fpdf import FPDF
 import tempfile
 import os
 from PIL import Image
+from fonte_remota import baixar_varios, ler_csvs
+from snapshot_dados import assinatura_arquivo
+from dados_compartilhados import carregar_compartilhado
+from atualizacao import AtualizadorDados
+from indice_clientes import IndiceClientes
+from busca_clientes import BuscaClientes
+from componentes_dashboard import cartoes_rfv, filtro_cliente_grupo
+from cubo_vendas import CuboVendas
+from armazem_sqlite import ArmazemSQLite, abrir_armazem
+from cache_analises import CacheAnalises, chave_analise
+from kpis import calcular_kpis
+from motor_rfv import TabelaRFV
+from colecoes import ultimas_colecoes, vendas_por_colecao
+from janelas_vendas import JanelasVendas, janelas_padrao
+from rankings import RankingVendas, top_k
+from esquema import COLUNAS_CODIGO, aplicar_esquema, normalizar_tipos
+from colunas_derivadas import aplicar_derivadas
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
@@ -92,62 +109,60 @@ meses_portugues = {
 URL_1 = "https://raw.githubusercontent.com/carlinhosg7/streamlit02/refs/heads/main/DADOS_PREDITIVA_1.csv"
 URL_2 = "https://raw.githubusercontent.com/carlinhosg7/streamlit02/refs/heads/main/DADOS_PREDITIVA_2.csv"
 
+# 'memoria' (padrão): base inteira em memória, com índice e cubo montados na carga.
+# 'sqlite': filtros e somas viram SQL indexado num banco em disco, sem carga inteira.
+BACKEND_DADOS = os.environ.get('KIDY_BACKEND', 'memoria')
+
+# Notas do RFV (motor_rfv.ESQUEMAS_RFV): 'faixas' fixas (padrão) ou 'quantis' da base, como o RFV.py
+ESQUEMA_RFV = os.environ.get('KIDY_RFV_ESQUEMA', 'faixas')
+
 # CARREGAR DADOS
-@st.cache_data(ttl=3600)
 def carregar_dados_processados():
-    try:
-        df1 = pd.read_csv(URL_1)
-        df2 = pd.read_csv(URL_2)
-        df = pd.concat([df1, df2], ignore_index=True)
-
-        # Conversões e ajustes como antes
-        df['Data Cadastro'] = pd.to_datetime(df['Data Cadastro'], errors='coerce')
-        df['Data Ultima Compra'] = pd.to_datetime(df['Data Ultima Compra'], errors='coerce')
-        df['Codigo Grupo Cliente'] = df['Codigo Grupo Cliente'].astype(str).str.upper()
-        df['Codigo Cliente'] = df['Codigo Cliente'].astype(str).str.upper()
-        df['Preço Médio Produto'] = df.apply(
-            lambda row: row['Vlr Venda'] / row['Qtd Venda'] if row['Qtd Venda'] > 0 else 0, axis=1
-        )
-        return df
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
-
-# RFV SCORE
-def calcular_rfv_individual(dados_filtrados):
-    hoje = datetime.today()
-
-    recencia = (hoje - dados_filtrados['Data Ultima Compra'].max()).days if pd.notnull(dados_filtrados['Data Ultima Compra'].max()) else 999
-    frequencia = dados_filtrados['Data Cadastro'].nunique()
-    valor = dados_filtrados['Vlr Venda'].sum()
-
-    recencia_score = 5 if recencia <= 30 else 4 if recencia <= 90 else 3 if recencia <= 180 else 2 if recencia <= 365 else 1
-    frequencia_score = 5 if frequencia >= 12 else 4 if frequencia >= 6 else 3 if frequencia >= 3 else 2 if frequencia >= 1 else 1
-    valor_score = 5 if valor >= 50000 else 4 if valor >= 20000 else 3 if valor >= 10000 else 2 if valor >= 5000 else 1
-
-    rfv_score = f"{recencia_score}{frequencia_score}{valor_score}"
-
-    if rfv_score == '555':
-        classificacao = 'Cliente VIP'
-    elif recencia_score >= 4 and frequencia_score >= 4:
-        classificacao = 'Cliente Leal'
-    elif recencia_score >= 3:
-        classificacao = 'Cliente Potencial'
-    else:
-        classificacao = 'Cliente em Risco'
-
-    return {
-        'Recência (dias)': recencia,
-        'Frequência (pedidos únicos)': frequencia,
-        'Valor Total (R$)': f"{valor:,.2f}",
-        'RFV Score': rfv_score,
-        'Classificação': classificacao
-    }
+    # As duas partes são baixadas em paralelo e revalidadas contra o cache em disco
+    caminhos = baixar_varios([URL_1, URL_2])
+
+    def construir():
+        df = ler_csvs(caminhos, dtype={c: str for c in COLUNAS_CODIGO})
+        # Mesmos tipos e colunas derivadas do snapshot (Ano, Preço Médio Produto, Colecao...)
+        return aplicar_derivadas(aplicar_esquema(normalizar_tipos(df)))
+
+    chave = [assinatura_arquivo(c) for c in caminhos]
+    if BACKEND_DADOS == 'sqlite':
+        # Banco SQLite indexado, também um por versão dos CSVs e aberto por todos os processos
+        return abrir_armazem('app6', chave, lambda: [construir()])
+    # Arquivo Arrow mapeado, refeito só quando algum CSV muda
+    return carregar_compartilhado('app6', chave, construir)
+
+def preparar_dados():
+    # Índice, busca, cubo, janelas e RFV montados uma vez por versão dos dados
+    if BACKEND_DADOS == 'sqlite':
+        # O armazém faz o papel do índice, do cubo e das janelas (uma soma SQL por janela);
+        # o RFV sai de um GROUP BY por chave, sem trazer linhas de venda para a memória
+        armazem = carregar_dados_processados()
+        tabela_rfv = TabelaRFV(armazem, ESQUEMA_RFV, agregar=ArmazemSQLite.agregar_rfv)
+        return armazem, BuscaClientes(armazem.clientes()), armazem, armazem, tabela_rfv
+    indice = IndiceClientes(carregar_dados_processados())
+    return indice, BuscaClientes(indice.dados), CuboVendas(indice), JanelasVendas(indice.dados), TabelaRFV(indice.dados, ESQUEMA_RFV)
+
+@st.cache_resource
+def atualizador_dados():
+    # Um por processo; revalida os CSVs em segundo plano a cada hora
+    return AtualizadorDados(preparar_dados, ttl=3600)
+
+@st.cache_resource
+def cache_analises():
+    # Compartilhado por todas as sessões do processo
+    return CacheAnalises(capacidade=64)
 
 # CARREGA DADOS
-df = carregar_dados_processados()
-
-if df.empty:
+try:
+    (indice, busca, cubo, janelas, tabela_rfv), versao_dados = atualizador_dados().obter_com_versao()
+    data_min, data_max = indice.intervalo_datas()
+except Exception as e:
+    st.error(f"Erro ao carregar dados: {e}")
+    data_min = data_max = pd.NaT
+
+if pd.isna(data_min):
     st.stop()
 
 # FILTROS SIDEBAR
@@ -155,11 +170,10 @@ st.title("📊 Dashboard Analítico")
 st.sidebar.image(logo_kidy, width=100)
 st.sidebar.header("🔧 Filtros de Análise")
 
-codigo_grupo_cliente = st.sidebar.text_input("Código do Grupo de Cliente (Opcional):").strip().upper()
-codigo_cliente = st.sidebar.text_input("Código do Cliente (Opcional):").strip().upper()
+codigo_grupo_cliente, codigo_cliente = filtro_cliente_grupo(busca)
 
-data_min = df['Data Cadastro'].min().date()
-data_max = df['Data Cadastro'].max().date()
+data_min = data_min.date()
+data_max = data_max.date()
 
 periodo = st.sidebar.date_input(
     "Período da análise:",
@@ -168,6 +182,147 @@ periodo = st.sidebar.date_input(
     max_value=data_max
 )
 
+# MACHINE LEARNING
+@st.cache_data(ttl=600)
+def preparar_dados_ml(_indice, versao):
+    # Mes Pedido e Compra já vêm da carga; só lê as colunas do modelo (a versão é a chave do cache)
+    return _indice.colunas(['Codigo Grupo Cliente', 'Codigo Cliente', 'Linha', 'Mes Pedido', 'Compra']).copy()
+
+@st.cache_resource
+def treinar_modelo_rf(df_ml):
+    le_grupo = LabelEncoder().fit(df_ml['Codigo Grupo Cliente'])
+    le_cliente = LabelEncoder().fit(df_ml['Codigo Cliente'])
+    le_linha = LabelEncoder().fit(df_ml['Linha'])
+
+    # Monta X à parte: df_ml volta do cache para todas as sessões e não deve ser alterado
+    X = pd.DataFrame({
+        'Grupo_Code': le_grupo.transform(df_ml['Codigo Grupo Cliente']),
+        'Cliente_Code': le_cliente.transform(df_ml['Codigo Cliente']),
+        'Linha_Code': le_linha.transform(df_ml['Linha']),
+        'Mes Pedido': df_ml['Mes Pedido'].to_numpy(),
+    })
+    y = df_ml['Compra']
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
+    modelo.fit(X_train, y_train)
+    acc = accuracy_score(y_test, modelo.predict(X_test))
+
+    return modelo, le_grupo, le_cliente, le_linha, acc
+
+# ANÁLISE COMPLETA DE UM GRUPO/CLIENTE
+def analisar(codigo_grupo_cliente, codigo_cliente, inicio, fim):
+    """Calcula tudo o que a tela e o PDF mostram; None se não houver vendas no período.
+
+    O resultado é compartilhado pelo cache entre sessões: quem o usa não deve alterá-lo.
+    """
+    # Fatia pelo índice (busca binária no cliente/grupo e no período), sem copiar a base
+    dados_filtrados = indice.fatia(codigo_cliente=codigo_cliente, codigo_grupo=codigo_grupo_cliente, inicio=inicio, fim=fim)
+    if dados_filtrados.empty:
+        return None
+
+    # Mesmo recorte no cubo (cliente × linha × mês): base dos totais, tabelas e gráficos
+    cubo_filtrado = cubo.consultar(inicio, fim, codigo_cliente=codigo_cliente, codigo_grupo=codigo_grupo_cliente)
+
+    # KPIs do cabeçalho numa só passada pelo recorte; cards e PDF leem deste objeto
+    kpis = calcular_kpis(dados_filtrados)
+
+    resultado = {
+        'cubo_filtrado': cubo_filtrado,
+        'kpis': kpis,
+        'nome_grupo': kpis.nome_grupo,
+        'total_lojas': kpis.lojas,
+        # RFV sobre todo o histórico, já calculado na carga: só uma consulta por chave
+        'rfv_resultado': tabela_rfv.cartao(codigo_cliente, codigo_grupo_cliente),
+        'ultima_compra': kpis.ultima_compra_texto,
+        'periodo_analise': kpis.periodo_texto,
+        'vendas_totais': kpis.qtd_venda,
+        'melhor_mes_nome': meses_portugues.get(kpis.melhor_mes, 'Mês inválido'),
+    }
+
+    # 3 últimas coleções (com a vigente): soma do cubo por código de coleção e consulta direta
+    colecoes_exibir = ultimas_colecoes(vendas_por_colecao(cubo_filtrado))
+
+    # Formata para exibição
+    colecoes_exibir.columns = ['Coleção', 'Pares Vendidos', 'Valor Vendido (R$)']
+    colecoes_exibir['Pares Vendidos'] = colecoes_exibir['Pares Vendidos'].astype(int)
+    colecoes_exibir['Valor Vendido (R$)'] = colecoes_exibir['Valor Vendido (R$)'].apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    resultado['colecoes_exibir'] = colecoes_exibir
+
+    # COMPARATIVO DE PERÍODOS: janelas que terminam no fim da análise, pelas somas acumuladas
+    comparativo = janelas.comparar(janelas_padrao(fim), codigo_cliente=codigo_cliente, codigo_grupo=codigo_grupo_cliente)
+    comparativo['Valor (R$)'] = comparativo['Valor (R$)'].apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    resultado['comparativo_periodos'] = comparativo
+
+    # TOP 10 LINHAS (seleção parcial sobre as somas por código, sem ordenar todas as linhas)
+    top_linhas = top_k(cubo_filtrado, 'Codigo Linha', acompanhar=['Linha']).rename(columns={'Qtd Venda': 'Quantidade Vendida'})
+
+    fig_top_linhas = px.bar(
+        top_linhas,
+        x='Linha',
+        y='Quantidade Vendida',
+        color='Linha',
+        text='Quantidade Vendida',
+        title='🎯 Top 10 Linhas Mais Vendidas'
+    )
+    fig_top_linhas.update_traces(textposition='outside')
+    resultado['top_linhas'] = top_linhas
+    resultado['fig_top_linhas'] = fig_top_linhas
+
+    # Ranking Linha → Referência do recorte, guardado com a análise para o detalhamento
+    resultado['ranking'] = RankingVendas(dados_filtrados)
+
+    # MACHINE LEARNING
+    df_ml = preparar_dados_ml(indice, versao_dados)
+    modelo_rf, le_grupo, le_cliente, le_linha, acc = treinar_modelo_rf(df_ml)
+    resultado['acuracia'] = acc
+    resultado['previsoes'] = None
+    resultado['erro_previsao'] = None
+
+    grupo_id = codigo_grupo_cliente or dados_filtrados['Codigo Grupo Cliente'].iloc[0]
+    cliente_id = codigo_cliente or dados_filtrados['Codigo Cliente'].iloc[0]
+    linhas_possiveis = df_ml['Linha'].unique()
+    mes_atual = datetime.now().month
+
+    try:
+        dados_para_prever = pd.DataFrame({
+            'Grupo_Code': le_grupo.transform([grupo_id] * len(linhas_possiveis)),
+            'Cliente_Code': le_cliente.transform([cliente_id] * len(linhas_possiveis)),
+            'Linha_Code': le_linha.transform(linhas_possiveis),
+            'Mes Pedido': [mes_atual] * len(linhas_possiveis)
+        })
+        probs = modelo_rf.predict_proba(dados_para_prever)[:, 1]
+
+        resultado['previsoes'] = pd.DataFrame({
+            'Linha': linhas_possiveis,
+            'Probabilidade de Compra': probs
+        }).sort_values(by='Probabilidade de Compra', ascending=False)
+    except ValueError as e:
+        resultado['erro_previsao'] = str(e)
+
+    # GRÁFICOS ANALÍTICOS
+    # Um groupby por ano no cubo alimenta os quatro gráficos anuais
+    por_ano = cubo_filtrado.groupby('Ano')
+    resumo_ano = por_ano[['Qtd Venda', 'Vlr Venda', 'SomaPreco', 'Linhas']].sum()
+    resumo_ano['Quantidade de Pedidos'] = por_ano['Codigo Cliente'].nunique()
+    resumo_ano['Preço Médio Produto'] = resumo_ano['SomaPreco'] / resumo_ano['Linhas']
+    resumo_ano = resumo_ano.reset_index()
+
+    fig1 = px.bar(resumo_ano, x='Ano', y='Qtd Venda', color='Ano', text='Qtd Venda', title="📦 Quantidade Vendida por Ano")
+    fig2 = px.bar(resumo_ano, x='Ano', y='Quantidade de Pedidos', color='Ano', text='Quantidade de Pedidos', title="📝 Quantidade de Pedidos por Ano")
+    fig3 = px.bar(resumo_ano, x='Ano', y='Preço Médio Produto', color='Ano', text='Preço Médio Produto', title="💰 Preço Médio dos Produtos por Ano")
+    fig4 = px.bar(resumo_ano, x='Ano', y='Vlr Venda', color='Ano', text='Vlr Venda', title="💸 Valores Vendidos por Ano")
+
+    # Mesmo top 10 da tabela (Codigo Linha e Linha são 1 para 1)
+    top10_periodo = top_linhas.rename(columns={'Quantidade Vendida': 'Qtd Venda'})
+    fig5 = px.bar(top10_periodo, x='Linha', y='Qtd Venda', color='Linha', text='Qtd Venda', title="🏆 Top 10 Linhas Mais Vendidas no Período")
+
+    for nome, fig in zip(['fig1', 'fig2', 'fig3', 'fig4', 'fig5'], [fig1, fig2, fig3, fig4, fig5]):
+        fig.update_traces(textposition='outside')
+        resultado[nome] = fig
+
+    return resultado
+
 # BOTÃO
 if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
 
@@ -175,60 +330,27 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
         st.sidebar.warning("⚠️ Informe pelo menos um código!")
     else:
         with st.spinner('🔎 Analisando dados...'):
-
-            dados_filtrados = df.copy()
-
-            if codigo_cliente:
-                dados_filtrados = dados_filtrados[dados_filtrados['Codigo Cliente'] == codigo_cliente]
-            elif codigo_grupo_cliente:
-                dados_filtrados = dados_filtrados[dados_filtrados['Codigo Grupo Cliente'] == codigo_grupo_cliente]
-
-            dados_filtrados = dados_filtrados[
-                (dados_filtrados['Data Cadastro'] >= pd.to_datetime(periodo[0])) &
-                (dados_filtrados['Data Cadastro'] <= pd.to_datetime(periodo[1]))
-            ]
-
-            if dados_filtrados.empty:
+            # Mesma consulta (mesma versão dos dados) devolve o resultado já pronto, para qualquer sessão
+            chave = chave_analise(versao_dados, codigo_grupo_cliente, codigo_cliente, periodo[0], periodo[1])
+            resultado = cache_analises().obter(
+                chave,
+                lambda: analisar(codigo_grupo_cliente, codigo_cliente, pd.to_datetime(periodo[0]), pd.to_datetime(periodo[1]))
+            )
+
+            if resultado is None:
                 st.warning("⚠️ Nenhum dado encontrado no período!")
             else:
-                dados_filtrados['Ano'] = dados_filtrados['Data Cadastro'].dt.year
-                nome_grupo = dados_filtrados['Grupo Cliente'].iloc[0]
-                total_lojas = dados_filtrados['Codigo Cliente'].nunique()
+                st.markdown(f"## 📍 Grupo Cliente: {resultado['nome_grupo']} | 🏬 Lojas: {resultado['total_lojas']}")
 
-                st.markdown(f"## 📍 Grupo Cliente: {nome_grupo} | 🏬 Lojas: {total_lojas}")
-
-                rfv_resultado = calcular_rfv_individual(dados_filtrados)
-                colrfv1, colrfv2, colrfv3, colrfv4, colrfv5 = st.columns(5)
-
-                for col, label, value in zip(
-                    [colrfv1, colrfv2, colrfv3, colrfv4, colrfv5],
-                    ['Recência (dias)', 'Frequência', 'Valor Total (R$)', 'RFV Score', 'Classificação'],
-                    [rfv_resultado['Recência (dias)'], rfv_resultado['Frequência (pedidos únicos)'], rfv_resultado['Valor Total (R$)'], rfv_resultado['RFV Score'], rfv_resultado['Classificação']]
-                ):
-                    col.markdown(f"""
-                        <div class="metric-card">
-                            <div class="metric-label">{label}</div>
-                            <div class="metric-value">{value}</div>
-                        </div>
-                    """, unsafe_allow_html=True)
+                rfv_resultado = resultado['rfv_resultado']
+                cartoes_rfv(rfv_resultado)
 
                 # KPIs
-                ultima_data_compra = dados_filtrados['Data Ultima Compra'].max()
-                ultima_compra = ultima_data_compra.strftime('%d/%m/%Y') if pd.notnull(ultima_data_compra) else 'Sem compras'
-
-                primeira_data = dados_filtrados['Data Cadastro'].min()
-                ultima_data = dados_filtrados['Data Cadastro'].max()
-                periodo_analise = f"{primeira_data.strftime('%d/%m/%Y')} até {ultima_data.strftime('%d/%m/%Y')}"
-
-                vendas_totais = dados_filtrados['Qtd Venda'].sum()
-                melhor_mes_num = dados_filtrados['Data Cadastro'].dt.month.mode()[0]
-                melhor_mes_nome = meses_portugues.get(melhor_mes_num, 'Mês inválido')
-
                 col1, col2, col3 = st.columns(3)
                 for col, label, value in zip(
                     [col1, col2, col3],
                     ['📅 Última Compra', '🕒 Período da Análise', '📈 Melhor Mês para Oferta'],
-                    [ultima_compra, periodo_analise, melhor_mes_nome]
+                    [resultado['ultima_compra'], resultado['periodo_analise'], resultado['melhor_mes_nome']]
                 ):
                     col.markdown(f"""
                         <div class="metric-card">
@@ -237,186 +359,55 @@ if st.sidebar.button("🔎 Analisar Grupo/Cliente"):
                         </div>
                     """, unsafe_allow_html=True)
 
-                st.success(f"📦 Total de Itens Vendidos: {vendas_totais:,} unidades")
-                
+                st.success(f"📦 Total de Itens Vendidos: {resultado['vendas_totais']:,} unidades")
+
                 # --- ANÁLISE DAS 3 ÚLTIMAS COLEÇÕES (INCLUINDO VIGENTE) ---
                 st.markdown("### 👟 Vendas das 3 Últimas Coleções (Pares e Valores)")
+                st.table(resultado['colecoes_exibir'])
 
-                # Função para identificar a coleção
-                def identificar_colecao(data):
-                    if pd.isnull(data):
-                        return None
-                    ano = data.year
-                    if 5 <= data.month <= 10:
-                        return f"Verão {ano}"
-                    elif data.month >= 11:
-                        return f"Inverno {ano + 1}"
-                    else:
-                        return f"Inverno {ano}"
-
-                # Determina a coleção vigente com base na data de hoje
-                hoje = datetime.today()
-                ano = hoje.year
-                mes = hoje.month
-                if 5 <= mes <= 10:
-                    colecao_vigente = f"Verão {ano}"
-                elif mes >= 11:
-                    colecao_vigente = f"Inverno {ano + 1}"
-                else:
-                    colecao_vigente = f"Inverno {ano}"
-
-                # Aplica a classificação de coleção
-                dados_filtrados['Colecao'] = dados_filtrados['Data Cadastro'].apply(identificar_colecao)
-
-                # Agrupamento por coleção
-                vendas_colecao = dados_filtrados.groupby('Colecao').agg({
-                    'Qtd Venda': 'sum',
-                    'Vlr Venda': 'sum'
-                }).reset_index()
-
-                # Ordena por ano extraído
-                vendas_colecao['Ano'] = vendas_colecao['Colecao'].str.extract(r'(\d{4})').astype(int)
-                vendas_colecao = vendas_colecao.sort_values(by='Ano', ascending=False)
-
-                # Garante que a coleção vigente esteja nas 3 últimas
-                colecoes_selecionadas = vendas_colecao.copy()
-                if colecao_vigente not in colecoes_selecionadas['Colecao'].values:
-                    linha_vigente = pd.DataFrame({'Colecao': [colecao_vigente], 'Qtd Venda': [0], 'Vlr Venda': [0.0], 'Ano': [int(colecao_vigente.split()[1])]})
-                    colecoes_selecionadas = pd.concat([linha_vigente, colecoes_selecionadas], ignore_index=True)
-
-                colecoes_exibir = colecoes_selecionadas.drop(columns='Ano').drop_duplicates('Colecao').head(3)
-
-                # Formata para exibição
-                colecoes_exibir.columns = ['Coleção', 'Pares Vendidos', 'Valor Vendido (R$)']
-                colecoes_exibir['Pares Vendidos'] = colecoes_exibir['Pares Vendidos'].astype(int)
-                colecoes_exibir['Valor Vendido (R$)'] = colecoes_exibir['Valor Vendido (R$)'].apply(lambda x: f"R$ {x:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
-
-                # Exibe
-                st.table(colecoes_exibir)
-
+                st.markdown("### 📆 Comparativo de Períodos")
+                st.table(resultado['comparativo_periodos'])
 
                 # TOP 10 LINHAS
-                total_vendas_linha = dados_filtrados.groupby(['Codigo Linha', 'Linha'])['Qtd Venda'].sum().reset_index(name='Quantidade Vendida')
-                top_linhas = total_vendas_linha.sort_values(by='Quantidade Vendida', ascending=False).head(10)
-
                 st.markdown("👉 **🔮 Top 10 Linhas Preditivas para Ofertar:**")
-                st.table(top_linhas)
-
-                fig_top_linhas = px.bar(
-                    top_linhas,
-                    x='Linha',
-                    y='Quantidade Vendida',
-                    color='Linha',
-                    text='Quantidade Vendida',
-                    title='🎯 Top 10 Linhas Mais Vendidas'
-                )
-                fig_top_linhas.update_traces(textposition='outside')
-                st.plotly_chart(fig_top_linhas)
+                st.table(resultado['top_linhas'])
+                st.plotly_chart(resultado['fig_top_linhas'])
 
                 # MACHINE LEARNING
                 st.subheader("🤖 Previsão de Linhas para Oferta (Machine Learning)")
+                st.info(f"🧠 Acurácia do modelo: {resultado['acuracia']:.2%}")
 
-                # Inicializa a barra de progresso
-                progress_bar = st.progress(0, text="⏳ Preparando dados para ML (0%)")
-
-                # Etapa 1: preparar dados
-                @st.cache_data(ttl=600)
-                def preparar_dados_ml(df):
-                    df_ml = df.copy()
-                    df_ml['Mes Pedido'] = df_ml['Data Cadastro'].dt.month
-                    df_ml['Compra'] = df_ml['Qtd Venda'].apply(lambda x: 1 if x > 0 else 0)
-                    return df_ml
-
-                dados_ml = preparar_dados_ml(df)
-                progress_bar.progress(20, text="✅ Etapa 1: Dados preparados (20%)")
-
-                # Etapa 2: Treinar modelo
-                @st.cache_resource
-                def treinar_modelo_rf(df_ml):
-                    le_grupo = LabelEncoder().fit(df_ml['Codigo Grupo Cliente'])
-                    le_cliente = LabelEncoder().fit(df_ml['Codigo Cliente'])
-                    le_linha = LabelEncoder().fit(df_ml['Linha'])
-
-                    df_ml['Grupo_Code'] = le_grupo.transform(df_ml['Codigo Grupo Cliente'])
-                    df_ml['Cliente_Code'] = le_cliente.transform(df_ml['Codigo Cliente'])
-                    df_ml['Linha_Code'] = le_linha.transform(df_ml['Linha'])
-
-                    X = df_ml[['Grupo_Code', 'Cliente_Code', 'Linha_Code', 'Mes Pedido']]
-                    y = df_ml['Compra']
-
-                    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-                    modelo = RandomForestClassifier(n_estimators=100, random_state=42)
-                    modelo.fit(X_train, y_train)
-                    acc = accuracy_score(y_test, modelo.predict(X_test))
-
-                    return modelo, le_grupo, le_cliente, le_linha, acc
-
-                modelo_rf, le_grupo, le_cliente, le_linha, acc = treinar_modelo_rf(dados_ml)
-                progress_bar.progress(50, text="✅ Etapa 2: Modelo treinado (50%)")
-
-                st.info(f"🧠 Acurácia do modelo: {acc:.2%}")
-                
-                # Etapa 3: Preparar dados para predição
-                grupo_id = codigo_grupo_cliente or dados_filtrados['Codigo Grupo Cliente'].iloc[0]
-                cliente_id = codigo_cliente or dados_filtrados['Codigo Cliente'].iloc[0]
-                linhas_possiveis = df['Linha'].unique()
-                mes_atual = datetime.now().month
-
-                try:
-                    dados_para_prever = pd.DataFrame({
-                        'Grupo_Code': le_grupo.transform([grupo_id] * len(linhas_possiveis)),
-                        'Cliente_Code': le_cliente.transform([cliente_id] * len(linhas_possiveis)),
-                        'Linha_Code': le_linha.transform(linhas_possiveis),
-                        'Mes Pedido': [mes_atual] * len(linhas_possiveis)
-                    })
-                    progress_bar.progress(70, text="✅ Etapa 3: Dados para predição gerados (70%)")
-
-                    probs = modelo_rf.predict_proba(dados_para_prever)[:, 1]
-
-                    df_preds = pd.DataFrame({
-                        'Linha': linhas_possiveis,
-                        'Probabilidade de Compra': probs
-                    }).sort_values(by='Probabilidade de Compra', ascending=False)
-
-                    progress_bar.progress(100, text="✅ Etapa 4: Predição finalizada (100%)")
-
+                if resultado['erro_previsao']:
+                    st.warning(f"⚠️ Erro ao prever: {resultado['erro_previsao']}. Verifique se o código do cliente ou grupo existe nos dados.")
+                else:
                     st.success("🎉 Predição realizada com sucesso!")
-                    st.table(df_preds.head(10))
-
-                except ValueError as e:
-                    st.warning(f"⚠️ Erro ao prever: {e}. Verifique se o código do cliente ou grupo existe nos dados.")
-                    progress_bar.progress(0, text="❌ Erro durante a predição.")
+                    st.table(resultado['previsoes'].head(10))
 
                 # GRÁFICOS ANALÍTICOS
                 st.subheader("📊 Gráficos Analíticos do Período Selecionado")
+                for nome in ['fig1', 'fig2', 'fig3', 'fig4', 'fig5']:
+                    st.plotly_chart(resultado[nome])
 
-                fig1 = px.bar(dados_filtrados.groupby('Ano')['Qtd Venda'].sum().reset_index(), x='Ano', y='Qtd Venda', color='Ano', text='Qtd Venda', title="📦 Quantidade Vendida por Ano")
-                fig2 = px.bar(dados_filtrados.groupby('Ano')['Codigo Cliente'].nunique().reset_index(name='Quantidade de Pedidos'), x='Ano', y='Quantidade de Pedidos', color='Ano', text='Quantidade de Pedidos', title="📝 Quantidade de Pedidos por Ano")
-                fig3 = px.bar(dados_filtrados.groupby('Ano')['Preço Médio Produto'].mean().reset_index(), x='Ano', y='Preço Médio Produto', color='Ano', text='Preço Médio Produto', title="💰 Preço Médio dos Produtos por Ano")
-                fig4 = px.bar(dados_filtrados.groupby('Ano')['Vlr Venda'].sum().reset_index(), x='Ano', y='Vlr Venda', color='Ano', text='Vlr Venda', title="💸 Valores Vendidos por Ano")
-
-                top10_periodo = dados_filtrados.groupby('Linha')['Qtd Venda'].sum().reset_index().sort_values(by='Qtd Venda', ascending=False).head(10)
-                fig5 = px.bar(top10_periodo, x='Linha', y='Qtd Venda', color='Linha', text='Qtd Venda', title="🏆 Top 10 Linhas Mais Vendidas no Período")
-
-                for fig in [fig1, fig2, fig3, fig4, fig5]:
-                    fig.update_traces(textposition='outside')
-                    st.plotly_chart(fig)
                 # 🔐 Armazena resultados no session_state para uso posterior (como PDF)
                 st.session_state['pdf_ready'] = True
-                st.session_state['dados_filtrados'] = dados_filtrados
-                st.session_state['rfv_resultado'] = rfv_resultado
-                st.session_state['top_linhas'] = top_linhas
-                st.session_state['nome_grupo'] = nome_grupo
-                st.session_state['total_lojas'] = total_lojas
-                st.session_state['periodo_analise'] = periodo_analise
-                st.session_state['ultima_compra'] = ultima_compra
-                st.session_state['fig1'] = fig1
-                st.session_state['fig2'] = fig2
-                st.session_state['fig3'] = fig3
-                st.session_state['fig4'] = fig4
-                st.session_state['fig5'] = fig5
+                for nome in ['kpis', 'rfv_resultado', 'colecoes_exibir', 'comparativo_periodos', 'top_linhas', 'ranking',
+                             'fig1', 'fig2', 'fig3', 'fig4', 'fig5']:
+                    st.session_state[nome] = resultado[nome]
+
+estatisticas_cache = cache_analises().estatisticas()
+st.sidebar.caption(
+    f"⚡ Cache de análises: {estatisticas_cache['acertos']} acertos, "
+    f"{estatisticas_cache['faltas']} faltas ({estatisticas_cache['itens']} guardadas)"
+)
 
 
+# DETALHAMENTO LINHA → REFERÊNCIA (fora do botão: trocar a linha não refaz a análise)
+if st.session_state.get("ranking") is not None:
+    st.subheader("🔎 Top 10 Referências por Linha")
+    ranking = st.session_state['ranking']
+    linha_detalhe = st.selectbox("Linha:", ranking.linhas())
+    if linha_detalhe is not None:
+        st.table(ranking.top_referencias(linha_detalhe).rename(columns={'Referencia': 'Referência', 'Qtd Venda': 'Quantidade Vendida'}))
 
 # Gerar PDF
 if st.session_state.get("pdf_ready", False):
@@ -475,18 +466,22 @@ if st.session_state.get("pdf_ready", False):
 
             pdf.set_font("Arial", size=12)
             pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 10, f"Grupo Cliente: {st.session_state['nome_grupo']}", ln=True)
-            pdf.cell(0, 10, f"Lojas Atendidas: {st.session_state['total_lojas']}", ln=True)
-            pdf.cell(0, 10, f"Período Analisado: {st.session_state['periodo_analise']}", ln=True)
-            pdf.cell(0, 10, f"Última Compra: {st.session_state['ultima_compra']}", ln=True)
+            kpis = st.session_state['kpis']
+            pdf.cell(0, 10, f"Grupo Cliente: {kpis.nome_grupo}", ln=True)
+            pdf.cell(0, 10, f"Lojas Atendidas: {kpis.lojas}", ln=True)
+            pdf.cell(0, 10, f"Período Analisado: {kpis.periodo_texto}", ln=True)
+            pdf.cell(0, 10, f"Última Compra: {kpis.ultima_compra_texto}", ln=True)
             pdf.ln(10)
 
             # RFV
             pdf.set_font("Arial", "B", 14)
             pdf.cell(0, 10, "Métricas RFV", ln=True)
             pdf.set_font("Arial", size=12)
-            for key, val in st.session_state['rfv_resultado'].items():
-                pdf.cell(0, 10, f"{key}: {val}", ln=True)
+            if st.session_state['rfv_resultado'] is None:
+                pdf.cell(0, 10, "RFV indisponível", ln=True)
+            else:
+                for key, val in st.session_state['rfv_resultado'].items():
+                    pdf.cell(0, 10, f"{key}: {val}", ln=True)
             pdf.ln(10)
 
             # COLEÇÕES
@@ -494,46 +489,17 @@ if st.session_state.get("pdf_ready", False):
             pdf.cell(0, 10, "Vendas das 3 Últimas Coleções", ln=True)
             pdf.set_font("Arial", size=12)
 
-            df_colecoes = st.session_state['dados_filtrados'].copy()
+            # Mesma tabela da tela, já calculada na análise
+            for _, row in st.session_state['colecoes_exibir'].iterrows():
+                pdf.cell(0, 10, f"{row['Coleção']} - {row['Pares Vendidos']} pares - {row['Valor Vendido (R$)']}", ln=True)
+            pdf.ln(10)
 
-            def identificar_colecao_pdf(data):
-                if pd.isnull(data):
-                    return None
-                ano = data.year
-                if 5 <= data.month <= 10:
-                    return f"Verão {ano}"
-                elif data.month >= 11:
-                    return f"Inverno {ano + 1}"
-                else:
-                    return f"Inverno {ano}"
-
-            df_colecoes['Colecao'] = df_colecoes['Data Cadastro'].apply(identificar_colecao_pdf)
-            colecao_vigente = identificar_colecao_pdf(datetime.today())
-
-            vendas_colecao = df_colecoes.groupby('Colecao').agg({
-                'Qtd Venda': 'sum',
-                'Vlr Venda': 'sum'
-            }).reset_index()
-
-            vendas_colecao['Ano'] = vendas_colecao['Colecao'].str.extract(r'(\d{4})').astype(int)
-            vendas_colecao = vendas_colecao.sort_values(by='Ano', ascending=False)
-
-            if colecao_vigente not in vendas_colecao['Colecao'].values:
-                linha_vigente = pd.DataFrame({
-                    'Colecao': [colecao_vigente],
-                    'Qtd Venda': [0],
-                    'Vlr Venda': [0.0],
-                    'Ano': [int(colecao_vigente.split()[1])]
-                })
-                vendas_colecao = pd.concat([linha_vigente, vendas_colecao], ignore_index=True)
-
-            colecoes_pdf = vendas_colecao.drop(columns='Ano').drop_duplicates('Colecao').head(3)
-
-            for _, row in colecoes_pdf.iterrows():
-                nome = row['Colecao']
-                pares = int(row['Qtd Venda'])
-                valor = f"R$ {row['Vlr Venda']:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                pdf.cell(0, 10, f"{nome} - {pares} pares - {valor}", ln=True)
+            # COMPARATIVO DE PERÍODOS
+            pdf.set_font("Arial", "B", 14)
+            pdf.cell(0, 10, "Comparativo de Períodos", ln=True)
+            pdf.set_font("Arial", size=12)
+            for _, row in st.session_state['comparativo_periodos'].iterrows():
+                pdf.cell(0, 10, f"{row['Período']} ({row['De']} a {row['Até']}): {row['Pares']} pares - {row['Valor (R$)']}", ln=True)
             pdf.ln(10)
 
             # TOP 10 LINHAS
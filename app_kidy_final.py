@@ -6,6 +6,7 @@ from fpdf import FPDF
 import tempfile
 import os
 from PIL import Image
+from snapshot_dados import carregar_snapshot
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
@@ -65,16 +66,12 @@ meses_portugues = {
 def carregar_dados_processados():
     try:
         file_path = r"C:/Kidy/PREDITIVA/DADOS_PREDITIVA.xlsx"
-        df = pd.read_excel(file_path, sheet_name='DADOS PREDITIVA')
+        df = carregar_snapshot(file_path, sheet_name='DADOS PREDITIVA')
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return pd.DataFrame()
 
-    df['Codigo Grupo Cliente'] = df['Codigo Grupo Cliente'].astype(str).str.upper()
-    df['Codigo Cliente'] = df['Codigo Cliente'].astype(str).str.upper()
-    df['Data Cadastro'] = pd.to_datetime(df['Data Cadastro'], errors='coerce')
-    df['Data Ultima Compra'] = pd.to_datetime(df['Data Ultima Compra'], errors='coerce')
-    df['Preço Médio Produto'] = df.apply(lambda row: row['Vlr Venda'] / row['Qtd Venda'] if row['Qtd Venda'] > 0 else 0, axis=1)
+    # Já tipado e com as colunas derivadas
     return df
 
 # ✅ FUNÇÃO RFV INDIVIDUAL COM SCORE
@@ -0,0 +1,221 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from esquema import aplicar_esquema
+from janelas_vendas import comparar_janelas
+from motor_rfv import ESQUEMAS_RFV
+
+# BANCO SQLITE LOCAL, COMPARTILHADO PELOS PROCESSOS DO SERVIDOR
+PASTA_ARMAZEM = Path(__file__).resolve().parent / ".armazem"
+# Mude quando a tabela ou os índices mudarem para gerar bancos novos
+VERSAO_ARMAZEM = 3
+
+COLUNAS_TEXTO = [
+    'Codigo Cliente', 'Razao Social', 'Codigo Grupo Cliente', 'Grupo Cliente', 'Codigo Representante',
+    'Codigo Supervisor', 'Numero Pedido', 'Codigo Linha', 'Linha', 'Referencia', 'Semestre', 'Colecao',
+]
+COLUNAS_DATA = ['Data Cadastro', 'Data Ultima Compra']
+
+INDICES = {
+    'ix_vendas_grupo_data': ['Codigo Grupo Cliente', 'Data Cadastro'],
+    'ix_vendas_cliente_data': ['Codigo Cliente', 'Data Cadastro'],
+    'ix_vendas_linha': ['Codigo Linha'],
+    'ix_vendas_data': ['Data Cadastro'],
+}
+
+CHAVES_CUBO = [
+    'Codigo Grupo Cliente', 'Codigo Cliente', 'Codigo Linha', 'Linha', 'Ano', 'Mes Pedido',
+    'Codigo Colecao', 'Colecao',
+]
+
+
+def _nome(coluna):
+    return '"' + coluna.replace('"', '""') + '"'
+
+
+# GRAVAÇÃO
+def _para_sqlite(bloco):
+    # Datas como texto ISO (ordenam certo no índice); categorias e códigos como texto
+    bloco = bloco.copy()
+    for coluna in bloco.columns:
+        if coluna in COLUNAS_DATA:
+            bloco[coluna] = bloco[coluna].dt.strftime('%Y-%m-%d')
+        elif isinstance(bloco[coluna].dtype, pd.CategoricalDtype) or coluna in COLUNAS_TEXTO:
+            bloco[coluna] = bloco[coluna].astype('object').where(bloco[coluna].notna(), None)
+        elif pd.api.types.is_extension_array_dtype(bloco[coluna].dtype):
+            bloco[coluna] = bloco[coluna].astype('float64')
+    return bloco
+
+
+def construir_armazem(blocos, caminho):
+    """Grava os blocos de linhas de venda na tabela `vendas` e cria os índices ao final."""
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    if temporario.exists():
+        temporario.unlink()
+
+    with sqlite3.connect(temporario) as conexao:
+        conexao.execute("PRAGMA journal_mode = OFF")
+        conexao.execute("PRAGMA synchronous = OFF")
+        linhas = 0
+        for bloco in blocos:
+            _para_sqlite(bloco).to_sql('vendas', conexao, if_exists='append', index=False, chunksize=10000)
+            linhas += len(bloco)
+        if not linhas:
+            raise ValueError("Nenhuma linha de venda para gravar no armazém")
+
+        # Índices depois da carga: bem mais rápido que mantê-los a cada insert
+        for nome, colunas in INDICES.items():
+            conexao.execute(f"CREATE INDEX {nome} ON vendas ({', '.join(map(_nome, colunas))})")
+        conexao.execute("ANALYZE")
+    conexao.close()
+    os.replace(temporario, caminho)
+    return caminho
+
+
+# CONSULTAS
+class ArmazemSQLite:
+    """Leitura das vendas direto do SQLite: filtros e somas viram SQL indexado.
+
+    Nada é carregado na abertura; cada consulta traz só as linhas ou células pedidas.
+    A conexão (somente leitura) é aberta já aqui e mantida: como o arquivo mapeado de
+    dados_compartilhados, o banco segue legível mesmo depois que outro processo grava
+    uma versão nova e apaga esta. As sessões do Streamlit rodam em threads, então as
+    consultas passam por uma trava.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._conexao = sqlite3.connect(
+            f"{self.caminho.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._trava = threading.Lock()
+
+    def _ler(self, sql, parametros=()):
+        with self._trava:
+            df = pd.read_sql_query(sql, self._conexao, params=parametros)
+        for coluna in COLUNAS_DATA:
+            if coluna in df.columns:
+                df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+        return aplicar_esquema(df)
+
+    def _filtro(self, codigo_cliente, codigo_grupo, inicio, fim):
+        # Cliente tem prioridade sobre grupo, como no filtro dos apps
+        condicoes, parametros = [], []
+        if codigo_cliente:
+            condicoes.append(f"{_nome('Codigo Cliente')} = ?")
+            parametros.append(str(codigo_cliente))
+        elif codigo_grupo:
+            condicoes.append(f"{_nome('Codigo Grupo Cliente')} = ?")
+            parametros.append(str(codigo_grupo))
+        if inicio is not None:
+            condicoes.append(f"{_nome('Data Cadastro')} >= ?")
+            parametros.append(pd.Timestamp(inicio).strftime('%Y-%m-%d'))
+        if fim is not None:
+            condicoes.append(f"{_nome('Data Cadastro')} <= ?")
+            parametros.append(pd.Timestamp(fim).strftime('%Y-%m-%d'))
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return onde, parametros
+
+    def fatia(self, codigo_cliente=None, codigo_grupo=None, inicio=None, fim=None):
+        """Linhas do cliente (ou grupo) no período, como IndiceClientes.fatia."""
+        onde, parametros = self._filtro(codigo_cliente, codigo_grupo, inicio, fim)
+        ordem = ', '.join(map(_nome, ['Codigo Grupo Cliente', 'Codigo Cliente', 'Data Cadastro']))
+        return self._ler(f"SELECT * FROM vendas {onde} ORDER BY {ordem}", parametros)
+
+    def consultar(self, inicio, fim, codigo_cliente=None, codigo_grupo=None):
+        """Células do cubo (mesmas medidas de CuboVendas.consultar), somadas pelo SQLite."""
+        onde, parametros = self._filtro(codigo_cliente, codigo_grupo, inicio, fim)
+        chaves = ', '.join(map(_nome, CHAVES_CUBO))
+        sql = f"""
+            SELECT {chaves},
+                   SUM({_nome('Qtd Venda')}) AS {_nome('Qtd Venda')},
+                   SUM({_nome('Vlr Venda')}) AS {_nome('Vlr Venda')},
+                   COUNT(*) AS Linhas,
+                   SUM({_nome('Preço Médio Produto')}) AS SomaPreco
+            FROM vendas {onde}
+            GROUP BY {chaves}
+        """
+        celulas = self._ler(sql, parametros)
+        # Resultado vazio volta sem tipos do SQLite; fixa os das medidas e do período
+        return celulas.astype({
+            'Ano': 'int16', 'Mes Pedido': 'int8', 'Codigo Colecao': 'int16', 'Qtd Venda': 'int64',
+            'Vlr Venda': 'float64', 'Linhas': 'int64', 'SomaPreco': 'float64',
+        })
+
+    def total(self, inicio, fim, codigo_cliente=None, codigo_grupo=None):
+        """(pares, valor) no período fechado [inicio, fim], como JanelasVendas.total."""
+        if not (codigo_cliente or codigo_grupo):
+            return 0, 0.0
+        onde, parametros = self._filtro(codigo_cliente, codigo_grupo, inicio, fim)
+        with self._trava:
+            pares, valor = self._conexao.execute(
+                f"SELECT TOTAL({_nome('Qtd Venda')}), TOTAL({_nome('Vlr Venda')}) FROM vendas {onde}", parametros
+            ).fetchone()
+        return int(round(pares)), float(valor)
+
+    def comparar(self, janelas, codigo_cliente=None, codigo_grupo=None):
+        # Uma soma indexada por janela, no lugar das somas acumuladas montadas na carga
+        return comparar_janelas(self.total, janelas, codigo_cliente, codigo_grupo)
+
+    def agregar_rfv(self, chave='Codigo Cliente', esquema='faixas'):
+        """Mesmos agregados de motor_rfv.agregar_tabela_rfv, somados pelo SQLite (para TabelaRFV)."""
+        if ESQUEMAS_RFV[esquema]['frequencia'] == 'dias':
+            frequencia = f"COUNT(DISTINCT {_nome('Data Cadastro')})"
+        else:
+            frequencia = f"COUNT({_nome('Numero Pedido')})"
+        sql = f"""
+            SELECT {_nome(chave)},
+                   MAX({_nome('Data Ultima Compra')}) AS {_nome('Ultima Compra')},
+                   {frequencia} AS Frequencia,
+                   TOTAL({_nome('Vlr Venda')}) AS Valor
+            FROM vendas
+            WHERE {_nome(chave)} IS NOT NULL
+            GROUP BY {_nome(chave)}
+            ORDER BY {_nome(chave)}
+        """
+        with self._trava:
+            tabela = pd.read_sql_query(sql, self._conexao, index_col=chave)
+        tabela['Ultima Compra'] = pd.to_datetime(tabela['Ultima Compra'], errors='coerce')
+        tabela.index = tabela.index.astype(str)
+        return tabela
+
+    def intervalo_datas(self):
+        # MIN/MAX numa coluna indexada: lidos direto do índice
+        coluna = _nome('Data Cadastro')
+        with self._trava:
+            minimo, maximo = self._conexao.execute(f"SELECT MIN({coluna}), MAX({coluna}) FROM vendas").fetchone()
+        return pd.Timestamp(minimo), pd.Timestamp(maximo)
+
+    def clientes(self):
+        colunas = ', '.join(map(_nome, ['Codigo Cliente', 'Razao Social', 'Codigo Grupo Cliente', 'Grupo Cliente']))
+        return self._ler(f"SELECT DISTINCT {colunas} FROM vendas")
+
+    def colunas(self, nomes):
+        return self._ler(f"SELECT {', '.join(map(_nome, nomes))} FROM vendas")
+
+
+def abrir_armazem(nome, chave, construir_blocos, pasta=PASTA_ARMAZEM):
+    """Abre a versão `chave` do banco `nome`, gravando-a com `construir_blocos()` se faltar.
+
+    Como em dados_compartilhados, cada versão tem arquivo próprio: um processo nunca
+    substitui o banco que outro ainda está lendo.
+    """
+    versao = hashlib.sha1(f"{VERSAO_ARMAZEM}|{chave}".encode("utf-8")).hexdigest()[:12]
+    caminho = Path(pasta) / f"{nome}-{versao}.sqlite"
+    if not caminho.exists():
+        construir_armazem(construir_blocos(), caminho)
+        for antigo in Path(pasta).glob(f"{nome}-*.sqlite"):
+            if antigo != caminho:
+                try:
+                    antigo.unlink()
+                except OSError:
+                    # Ainda aberto por outro processo (Windows): fica para a próxima limpeza
+                    pass
+    return ArmazemSQLite(caminho)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+
+# ATUALIZAÇÃO EM SEGUNDO PLANO (stale-while-revalidate)
+class AtualizadorDados:
+    """Mantém um dataset em memória e o renova sem bloquear quem está lendo.
+
+    `obter()` devolve sempre a versão atual. Quando o TTL vence ou a assinatura da
+    fonte muda, uma única thread recarrega os dados e troca a referência de uma vez;
+    as sessões continuam recebendo a versão anterior até a nova ficar pronta.
+    """
+
+    def __init__(self, carregar, ttl=3600, assinatura=None, intervalo_verificacao=30):
+        self._carregar = carregar
+        self._assinatura = assinatura
+        self.ttl = ttl
+        self.intervalo_verificacao = intervalo_verificacao
+
+        self._estado = None  # (dados, carregado_em, assinatura da fonte, versão)
+        self._trava_carga = threading.Lock()
+        self._ultima_verificacao = 0.0
+        self.ultimo_erro = None
+
+    def _ler_assinatura(self):
+        return self._assinatura() if self._assinatura is not None else None
+
+    def _recarregar(self):
+        assinatura = self._ler_assinatura()
+        dados = self._carregar()
+        versao = 1 if self._estado is None else self._estado[3] + 1
+        # Uma só atribuição: quem lê vê o estado antigo inteiro ou o novo inteiro
+        self._estado = (dados, time.monotonic(), assinatura, versao)
+        self.ultimo_erro = None
+
+    def _recarregar_em_segundo_plano(self):
+        try:
+            self._recarregar()
+        except Exception as e:
+            # Mantém os dados atuais e só tenta de novo depois do intervalo de verificação
+            self.ultimo_erro = e
+            dados, _, assinatura, versao = self._estado
+            self._estado = (dados, time.monotonic() - self.ttl + self.intervalo_verificacao, assinatura, versao)
+        finally:
+            self._trava_carga.release()
+
+    def _fonte_mudou(self, assinatura_atual):
+        if self._assinatura is None:
+            return False
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return False
+        self._ultima_verificacao = agora
+        try:
+            return self._ler_assinatura() != assinatura_atual
+        except OSError:
+            # Fonte indisponível no momento (drive desmontado): segue com o que tem
+            return False
+
+    def vencido(self):
+        _, carregado_em, assinatura, _ = self._estado
+        return time.monotonic() - carregado_em >= self.ttl or self._fonte_mudou(assinatura)
+
+    def atualizar(self):
+        # Single-flight: se já há uma recarga em andamento, não dispara outra
+        if not self._trava_carga.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._recarregar_em_segundo_plano, daemon=True).start()
+        return True
+
+    def obter(self):
+        return self.obter_com_versao()[0]
+
+    def obter_com_versao(self):
+        """Dados atuais e o número da versão (sobe a cada recarga), lidos do mesmo estado."""
+        if self._estado is None:
+            # Primeira carga: não há versão antiga para servir, então espera (uma só carga)
+            with self._trava_carga:
+                if self._estado is None:
+                    self._recarregar()
+        elif self.vencido():
+            self.atualizar()
+        dados, _, _, versao = self._estado
+        return dados, versao
@@ -0,0 +1,120 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+# Código que o ERP usa para clientes sem grupo: não é um grupo de verdade para a busca
+SEM_GRUPO = 'NÃO INFORMADO'
+
+
+# NORMALIZAÇÃO: maiúsculas, sem acentos e sem pontuação
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'[^0-9A-Z]+', ' ', texto.upper()).strip()
+
+
+def _trigramas(texto):
+    # Palavra a palavra: o começo e o fim de cada palavra contam, não só os do nome
+    trigramas = set()
+    for palavra in texto.split():
+        palavra = f"  {palavra} "
+        trigramas.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return trigramas
+
+
+# ÍNDICE DE BUSCA
+class BuscaClientes:
+    """Busca por código, Razão Social ou Grupo Cliente para o seletor da barra lateral.
+
+    Prefixos (código inteiro ou qualquer palavra do nome) vêm de uma lista ordenada
+    com busca binária; o restante é completado por semelhança de trigramas,
+    o que tolera erros de digitação.
+    """
+
+    def __init__(self, df, similaridade_minima=0.35):
+        # 0.35: uma transposição ("ITPAUA" por "ITAPUA") ainda cobre 3 dos 7 trigramas
+        self.similaridade_minima = similaridade_minima
+        self.entradas = []
+        textos = []
+
+        clientes = df[['Codigo Cliente', 'Razao Social', 'Grupo Cliente']]
+        for codigo, razao, grupo in clientes.drop_duplicates('Codigo Cliente').itertuples(index=False):
+            self.entradas.append({
+                'tipo': 'cliente',
+                'codigo': codigo,
+                'rotulo': f"Cliente {codigo} - {razao} ({grupo})",
+            })
+            textos.append([_normalizar(codigo), _normalizar(razao)])
+
+        grupos = df[['Codigo Grupo Cliente', 'Grupo Cliente']].drop_duplicates('Codigo Grupo Cliente')
+        for codigo, grupo in grupos.itertuples(index=False):
+            if codigo == SEM_GRUPO:
+                continue
+            self.entradas.append({
+                'tipo': 'grupo',
+                'codigo': codigo,
+                'rotulo': f"Grupo {codigo} - {grupo}",
+            })
+            textos.append([_normalizar(codigo), _normalizar(grupo)])
+
+        # Prefixos: (termo, entrada) ordenados pelo termo
+        pares = sorted(
+            (termo, i)
+            for i, campos in enumerate(textos)
+            for campo in campos
+            for termo in {campo, *campo.split()}
+            if termo
+        )
+        self._termos = [termo for termo, _ in pares]
+        self._entrada_do_termo = np.array([i for _, i in pares], dtype='int32')
+
+        # Trigramas: lista invertida trigrama -> entradas
+        postings = defaultdict(list)
+        self._qtd_trigramas = np.zeros(len(self.entradas), dtype='int32')
+        for i, campos in enumerate(textos):
+            trigramas = set().union(*(_trigramas(campo) for campo in campos if campo))
+            self._qtd_trigramas[i] = len(trigramas)
+            for trigrama in trigramas:
+                postings[trigrama].append(i)
+        self._postings = {t: np.array(ids, dtype='int32') for t, ids in postings.items()}
+
+    def _por_prefixo(self, consulta, limite):
+        a = bisect_left(self._termos, consulta)
+        b = bisect_left(self._termos, consulta + '\uffff')
+        encontrados = {}
+        # Termos mais curtos (o próprio código, a palavra exata) vêm primeiro na ordem
+        for posicao in range(a, b):
+            encontrados.setdefault(int(self._entrada_do_termo[posicao]), None)
+            if len(encontrados) >= limite:
+                break
+        return list(encontrados)
+
+    def _por_trigramas(self, consulta, limite):
+        trigramas = _trigramas(consulta)
+        listas = [self._postings[t] for t in trigramas if t in self._postings]
+        if not listas:
+            return []
+        comuns = np.bincount(np.concatenate(listas), minlength=len(self.entradas))
+        # Quanto da consulta aparece na entrada; empate decidido pela entrada mais curta (Jaccard)
+        cobertura = comuns / len(trigramas)
+        jaccard = comuns / (len(trigramas) + self._qtd_trigramas - comuns)
+
+        candidatos = np.flatnonzero(cobertura >= self.similaridade_minima)
+        if len(candidatos) > limite:
+            pontos = cobertura[candidatos] + jaccard[candidatos] / 100
+            candidatos = candidatos[np.argpartition(-pontos, limite)[:limite]]
+        ordem = np.lexsort((-jaccard[candidatos], -cobertura[candidatos]))
+        return candidatos[ordem].tolist()
+
+    def buscar(self, consulta, limite=10):
+        consulta = _normalizar(consulta)
+        if not consulta:
+            return []
+        ids = self._por_prefixo(consulta, limite)
+        if len(ids) < limite:
+            vistos = set(ids)
+            ids += [i for i in self._por_trigramas(consulta, limite) if i not in vistos]
+        return [self.entradas[i] for i in ids[:limite]]
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import pandas as pd
+
+
+# CHAVE DA CONSULTA
+def chave_analise(versao, codigo_grupo=None, codigo_cliente=None, inicio=None, fim=None, hoje=None):
+    """Normaliza a consulta: códigos sem espaços e em maiúsculas, período em datas.
+
+    `hoje` entra na chave porque recência e coleção vigente dependem do dia.
+    """
+    def codigo(valor):
+        return (valor or '').strip().upper()
+
+    def dia(valor):
+        return None if valor is None else pd.Timestamp(valor).date()
+
+    return (versao, codigo(codigo_grupo), codigo(codigo_cliente), dia(inicio), dia(fim), hoje or date.today())
+
+
+# CACHE LRU COMPARTILHADO ENTRE SESSÕES
+class CacheAnalises:
+    """Resultados de análises completas, limitados às `capacidade` consultas mais recentes.
+
+    Seguro entre threads: as sessões do Streamlit rodam em threads do mesmo processo.
+    O cálculo roda fora da trava, então uma análise lenta não bloqueia as outras.
+    """
+
+    def __init__(self, capacidade=64):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave, calcular):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+            self.faltas += 1
+
+        valor = calcular()
+
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        with self._trava:
+            consultas = self.acertos + self.faltas
+            return {
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'itens': len(self._itens),
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# CÓDIGO INTEIRO DA COLEÇÃO: ano da coleção × 2 + 1 no Verão (-1 sem data).
+# A ordem dos códigos é a cronológica: Inverno 2024 < Verão 2024 < Inverno 2025.
+SEM_COLECAO = -1
+
+
+def codigo_colecao(ano, mes):
+    """Códigos das coleções a partir de ano e mês do pedido, vetorizado.
+
+    Maio a outubro vende o Verão do ano; novembro já vende o Inverno do ano seguinte.
+    """
+    ano = np.asarray(ano, dtype='float64')
+    mes = np.asarray(mes, dtype='float64')
+    verao = (mes >= 5) & (mes <= 10)
+    codigos = (ano + (mes >= 11)) * 2 + verao
+    return np.where(np.isnan(ano) | np.isnan(mes), SEM_COLECAO, codigos).astype('int16')
+
+
+def rotulo_colecao(codigo):
+    return f"{'Verão' if codigo % 2 else 'Inverno'} {int(codigo) // 2}"
+
+
+def colecao_vigente(hoje=None):
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today())
+    return int(codigo_colecao(hoje.year, hoje.month))
+
+
+def inicio_colecao(data):
+    # Primeiro dia de venda da coleção da data: 1º de maio (Verão) ou 1º de novembro (Inverno)
+    data = pd.Timestamp(data).normalize()
+    if 5 <= data.month <= 10:
+        return data.replace(month=5, day=1)
+    ano = data.year if data.month >= 11 else data.year - 1
+    return pd.Timestamp(year=ano, month=11, day=1)
+
+
+# CONSULTAS SOBRE O AGREGADO
+def vendas_por_colecao(celulas):
+    # Soma por código inteiro: sem texto para agrupar nem ano para extrair do rótulo
+    vendas = celulas.groupby('Codigo Colecao')[['Qtd Venda', 'Vlr Venda']].sum()
+    return vendas[vendas.index != SEM_COLECAO]
+
+
+def ultimas_colecoes(vendas, hoje=None, quantidade=3):
+    """As `quantidade` coleções mais recentes, sempre incluindo a vigente (zerada se não vendeu)."""
+    codigos = np.union1d(vendas.index.to_numpy(), [colecao_vigente(hoje)])[::-1][:quantidade]
+    ultimas = vendas.reindex(codigos, fill_value=0)
+    return pd.DataFrame({
+        'Colecao': [rotulo_colecao(c) for c in codigos],
+        'Qtd Venda': ultimas['Qtd Venda'].to_numpy(),
+        'Vlr Venda': ultimas['Vlr Venda'].to_numpy(dtype='float64'),
+    })
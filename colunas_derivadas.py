@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from colecoes import codigo_colecao, rotulo_colecao
+
+
+# FUNÇÕES VETORIZADAS (uma passada NumPy por coluna, sem apply linha a linha)
+def _numeros(serie):
+    return serie.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _mes(df):
+    return df['Data Cadastro'].dt.month.astype('Int8')
+
+
+def _ano(df):
+    return df['Data Cadastro'].dt.year.astype('Int16')
+
+
+def _preco_medio(df):
+    qtd = df['Qtd Venda'].to_numpy(dtype='float64')
+    vlr = df['Vlr Venda'].to_numpy(dtype='float64')
+    return np.divide(vlr, qtd, out=np.zeros_like(vlr), where=qtd > 0)
+
+
+def _compra(df):
+    return (df['Qtd Venda'].to_numpy() > 0).astype('int8')
+
+
+def _semestre_num(df):
+    mes = _numeros(df['Mes Pedido'])
+    return pd.Series(np.where(mes <= 6, 1.0, 2.0), index=df.index).mask(np.isnan(mes)).astype('Int8')
+
+
+def _semestre(df):
+    # Sem data vira código -1 (categoria nula)
+    codigos = df['SemestreNum'].fillna(0).to_numpy(dtype='int8') - 1
+    return pd.Categorical.from_codes(codigos, categories=['1º Semestre', '2º Semestre'])
+
+
+def _codigo_colecao(df):
+    return codigo_colecao(_numeros(df['Ano']), _numeros(df['Mes Pedido']))
+
+
+def _colecao(df):
+    # Rótulo só para exibir; as contas usam o código inteiro
+    codigos = df['Codigo Colecao'].to_numpy()
+    unicos = np.unique(codigos[codigos >= 0])
+    posicoes = np.where(codigos >= 0, np.searchsorted(unicos, codigos), -1)
+    return pd.Categorical.from_codes(posicoes, categories=[rotulo_colecao(c) for c in unicos])
+
+
+# PIPELINE DECLARATIVO: (coluna, colunas de que depende, função, tipo em disco)
+# A ordem importa: cada coluna pode usar as derivadas anteriores.
+COLUNAS_DERIVADAS = [
+    ('Ano', ['Data Cadastro'], _ano, pa.int16()),
+    ('Mes Pedido', ['Data Cadastro'], _mes, pa.int8()),
+    ('Preço Médio Produto', ['Qtd Venda', 'Vlr Venda'], _preco_medio, pa.float64()),
+    ('Compra', ['Qtd Venda'], _compra, pa.int8()),
+    ('SemestreNum', ['Mes Pedido'], _semestre_num, pa.int8()),
+    ('Semestre', ['SemestreNum'], _semestre, pa.string()),
+    ('Codigo Colecao', ['Ano', 'Mes Pedido'], _codigo_colecao, pa.int16()),
+    ('Colecao', ['Codigo Colecao'], _colecao, pa.string()),
+]
+
+TIPOS_ARROW_DERIVADOS = {nome: tipo for nome, _, _, tipo in COLUNAS_DERIVADAS}
+
+
+def aplicar_derivadas(df):
+    for nome, dependencias, funcao, _ in COLUNAS_DERIVADAS:
+        if all(coluna in df.columns for coluna in dependencias):
+            df[nome] = funcao(df)
+    return df
+
+
+def completar_derivadas(df):
+    # Só as que faltam: bases gravadas antes de uma coluna nova ganham a coluna na leitura
+    for nome, dependencias, funcao, _ in COLUNAS_DERIVADAS:
+        if nome not in df.columns and all(coluna in df.columns for coluna in dependencias):
+            df[nome] = funcao(df)
+    return df
@@ -0,0 +1,50 @@
+import streamlit as st
+
+# PEÇAS COMUNS DOS DASHBOARDS (app3, app6 e visual final)
+ROTULOS_RFV = [
+    ('Recência (dias)', 'Recência (dias)'),
+    ('Frequência', 'Frequência (pedidos únicos)'),
+    ('Valor Total (R$)', 'Valor Total (R$)'),
+    ('RFV Score', 'RFV Score'),
+    ('Classificação', 'Classificação'),
+]
+
+
+def filtro_cliente_grupo(busca):
+    """Busca da barra lateral e os códigos opcionais; devolve (codigo_grupo_cliente, codigo_cliente)."""
+    termo_busca = st.sidebar.text_input("🔍 Buscar cliente ou grupo (código, razão social ou nome do grupo):")
+    sugestoes = busca.buscar(termo_busca) if termo_busca else []
+    selecionado = st.sidebar.selectbox(
+        "Resultados da busca:",
+        sugestoes,
+        index=None,
+        format_func=lambda s: s['rotulo'],
+        placeholder="Escolha um resultado" if sugestoes else "Nenhum resultado",
+    )
+
+    codigo_grupo_cliente = st.sidebar.text_input("Código do Grupo de Cliente (Opcional):").strip().upper()
+    codigo_cliente = st.sidebar.text_input("Código do Cliente (Opcional):").strip().upper()
+
+    # Códigos digitados têm prioridade; sem eles, vale o resultado escolhido na busca
+    if selecionado is not None and not codigo_grupo_cliente and not codigo_cliente:
+        if selecionado['tipo'] == 'cliente':
+            codigo_cliente = selecionado['codigo']
+        else:
+            codigo_grupo_cliente = selecionado['codigo']
+    return codigo_grupo_cliente, codigo_cliente
+
+
+def cartoes_rfv(rfv_resultado):
+    """Os cinco cards do RFV (TabelaRFV.cartao) ou o aviso quando a chave não tem RFV."""
+    if rfv_resultado is None:
+        # Sem vendas com data no histórico: não há RFV para esta chave
+        st.warning("⚠️ RFV indisponível para este cliente/grupo.")
+        return
+    st.caption("RFV calculado sobre todo o histórico do cliente/grupo, não só o período selecionado.")
+    for col, (label, chave) in zip(st.columns(len(ROTULOS_RFV)), ROTULOS_RFV):
+        col.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-label">{label}</div>
+                <div class="metric-value">{rfv_resultado[chave]}</div>
+            </div>
+        """, unsafe_allow_html=True)
@@ -0,0 +1,139 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from agregacao_particionada import PASTA_RESUMOS, gravar_parquet, iterar_particoes
+from busca_clientes import SEM_GRUPO
+from ingestao import PASTA_DATASET
+
+# CRESCIMENTO MÊS A MÊS (MoM) E ANO A ANO (YoY) DE TODOS OS GRUPOS E CLIENTES
+COLUNAS_CRESCIMENTO = [
+    'Codigo Grupo Cliente', 'Grupo Cliente', 'Codigo Cliente', 'Razao Social',
+    'Numero Pedido', 'Data Cadastro', 'Qtd Venda', 'Vlr Venda',
+]
+CHAVES = {
+    'clientes': ('Codigo Cliente', 'Razao Social'),
+    'grupos': ('Codigo Grupo Cliente', 'Grupo Cliente'),
+}
+MEDIDAS = ['Pares', 'Valor', 'Pedidos']
+MEDIDAS_INTEIRAS = ['Pares', 'Pedidos']
+
+
+# PARCIAIS MENSAIS (somáveis entre partições)
+def parcial_mensal(linhas, chave):
+    # Mês como inteiro (meses desde 1970): as defasagens viram deslocamentos de coluna
+    linhas = linhas[linhas['Data Cadastro'].notna()]
+    mes = linhas['Data Cadastro'].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]').astype('int64')
+    grupos = linhas.assign(Mes=mes).groupby([chave, 'Mes'], observed=True)
+    # Um pedido tem uma só data e um só supervisor: o nunique soma sem dupla contagem
+    return pd.DataFrame({
+        'Pares': grupos['Qtd Venda'].sum(),
+        'Valor': grupos['Vlr Venda'].sum(),
+        'Pedidos': grupos['Numero Pedido'].nunique(),
+    })
+
+
+def parcial_nomes(linhas, chave, nome):
+    return linhas[[chave, nome]].dropna().drop_duplicates(chave)
+
+
+# VISÃO MATERIALIZADA
+def calcular_crescimento(mensal, nomes, chave, nome):
+    """Cada chave × mês com o mês anterior, o mesmo mês do ano anterior e as variações.
+
+    Monta uma matriz chaves × meses por medida e compara deslocando colunas (1 e 12),
+    de uma vez para todas as chaves; só ficam os meses em que algum dos três tem venda.
+    """
+    mensal = mensal.reset_index()
+    codigos, chaves = pd.factorize(mensal[chave].astype(str))
+    primeiro = int(mensal['Mes'].min())
+    meses = mensal['Mes'].to_numpy() - primeiro
+    forma = (len(chaves), int(meses.max()) + 1)
+
+    colunas = {}
+    algum = np.zeros(forma, dtype=bool)
+    for medida in MEDIDAS:
+        atual = np.zeros(forma)
+        atual[codigos, meses] = mensal[medida].to_numpy(dtype='float64')
+        anterior = np.zeros(forma)
+        anterior[:, 1:] = atual[:, :-1]
+        ano_anterior = np.zeros(forma)
+        ano_anterior[:, 12:] = atual[:, :-12]
+        algum |= (atual != 0) | (anterior != 0) | (ano_anterior != 0)
+        colunas[medida] = (atual, anterior, ano_anterior)
+
+    linha, coluna = np.nonzero(algum)
+    tabela = pd.DataFrame({
+        chave: np.asarray(chaves)[linha],
+        'Mes': (coluna + primeiro).astype('datetime64[M]').astype('datetime64[ns]'),
+    })
+    for medida, (atual, anterior, ano_anterior) in colunas.items():
+        atual, anterior, ano_anterior = atual[linha, coluna], anterior[linha, coluna], ano_anterior[linha, coluna]
+        tabela[medida] = atual
+        tabela[f'{medida} Mês Anterior'] = anterior
+        tabela[f'Δ {medida} MoM'] = atual - anterior
+        tabela[f'{medida} MoM %'] = np.divide(atual - anterior, anterior, out=np.full_like(atual, np.nan), where=anterior > 0) * 100
+        tabela[f'{medida} Ano Anterior'] = ano_anterior
+        tabela[f'Δ {medida} YoY'] = atual - ano_anterior
+        tabela[f'{medida} YoY %'] = np.divide(atual - ano_anterior, ano_anterior, out=np.full_like(atual, np.nan), where=ano_anterior > 0) * 100
+        if medida in MEDIDAS_INTEIRAS:
+            inteiras = [medida, f'{medida} Mês Anterior', f'Δ {medida} MoM', f'{medida} Ano Anterior', f'Δ {medida} YoY']
+            tabela[inteiras] = tabela[inteiras].round().astype('int64')
+
+    nomes = nomes.astype({chave: str, nome: str}).drop_duplicates(chave)
+    tabela.insert(1, nome, tabela[chave].map(nomes.set_index(chave)[nome]))
+    return tabela
+
+
+def gerar_crescimento(pasta=PASTA_DATASET, destino=PASTA_RESUMOS):
+    """Lê o histórico uma vez, partição a partição, e grava a visão de clientes e de grupos."""
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+
+    parciais = {tipo: ([], []) for tipo in CHAVES}
+    for linhas in iterar_particoes(pasta, colunas=COLUNAS_CRESCIMENTO):
+        for tipo, (chave, nome) in CHAVES.items():
+            parciais[tipo][0].append(parcial_mensal(linhas, chave))
+            parciais[tipo][1].append(parcial_nomes(linhas, chave, nome))
+
+    gerados = []
+    for tipo, (chave, nome) in CHAVES.items():
+        mensais, nomes = parciais[tipo]
+        if not mensais:
+            raise ValueError(f"Nenhuma partição encontrada em {pasta}")
+        mensal = pd.concat(mensais).groupby(level=[0, 1], observed=True).sum()
+        if tipo == 'grupos':
+            # Clientes sem grupo não formam um grupo de verdade (como na busca)
+            mensal = mensal[mensal.index.get_level_values(0) != SEM_GRUPO]
+        tabela = calcular_crescimento(mensal, pd.concat(nomes, ignore_index=True), chave, nome)
+        gravar_parquet(tabela, destino / f"crescimento_{tipo}.parquet")
+        gerados.append((tipo, len(tabela)))
+    return gerados
+
+
+# LEITURA PELOS APPS
+def meses_crescimento(tipo='grupos', pasta=PASTA_RESUMOS):
+    meses = ds.dataset(Path(pasta) / f"crescimento_{tipo}.parquet").to_table(columns=['Mes']).column('Mes')
+    return sorted(pd.to_datetime(pd.unique(meses.to_pandas())), reverse=True)
+
+
+def placar_crescimento(mes, tipo='grupos', metrica='Δ Valor YoY', quantidade=50, crescente=False, pasta=PASTA_RESUMOS):
+    """Leaderboard de um mês: lê só as linhas do mês e devolve as `quantidade` primeiras pela métrica."""
+    tabela = ds.dataset(Path(pasta) / f"crescimento_{tipo}.parquet").to_table(
+        filter=ds.field('Mes') == pd.Timestamp(mes)
+    ).to_pandas()
+    ordenado = tabela.nsmallest(quantidade, metrica) if crescente else tabela.nlargest(quantidade, metrica)
+    return ordenado.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera a visão de crescimento MoM/YoY de todos os grupos e clientes")
+    parser.add_argument("--dataset", default=str(PASTA_DATASET))
+    parser.add_argument("--destino", default=str(PASTA_RESUMOS))
+    args = parser.parse_args()
+
+    for tipo, linhas in gerar_crescimento(args.dataset, args.destino):
+        print(f"{tipo}: {linhas} linhas")
@@ -0,0 +1,99 @@
+import pandas as pd
+
+from indice_clientes import IndiceClientes
+
+# GRÃO DO CUBO: grupo × cliente × linha × ano × mês (Codigo Linha e a coleção só acompanham)
+CHAVES_CUBO = [
+    'Codigo Grupo Cliente', 'Codigo Cliente', 'Codigo Linha', 'Linha', 'Ano', 'Mes Pedido',
+    'Codigo Colecao', 'Colecao',
+]
+CHAVES_PEDIDOS = ['Codigo Grupo Cliente', 'Codigo Cliente', 'Ano', 'Mes Pedido']
+MEDIDAS_CUBO = ['Qtd Venda', 'Vlr Venda', 'Linhas', 'SomaPreco']
+
+
+def _com_inicio_mes(agregado):
+    # 'Data Cadastro' da célula = 1º dia do mês, para o IndiceClientes recortar por período
+    agregado['Data Cadastro'] = pd.to_datetime(
+        {'year': agregado['Ano'].astype('int64'), 'month': agregado['Mes Pedido'].astype('int64'), 'day': 1}
+    )
+    return agregado
+
+
+# FRAGMENTOS: linhas brutas já no formato do cubo (cada uma é uma "célula" parcial)
+def fragmentos_celulas(linhas):
+    """Linhas de venda com as medidas do cubo; somadas por qualquer chave, dão o mesmo que as células.
+
+    Todas as medidas são somas: Linhas conta as linhas de venda e SomaPreco soma o
+    'Preço Médio Produto', então SomaPreco / Linhas reproduz a média por linha.
+    """
+    return linhas.assign(Linhas=1, SomaPreco=linhas['Preço Médio Produto'])[
+        CHAVES_CUBO + ['Data Cadastro'] + MEDIDAS_CUBO
+    ]
+
+
+def fragmentos_pedidos(linhas):
+    # Um pedido tem um só cliente e uma só data: contar uma vez por (cliente, pedido) basta
+    pedidos = linhas.drop_duplicates(['Codigo Cliente', 'Numero Pedido'])
+    return pedidos.assign(Pedidos=1)[CHAVES_PEDIDOS + ['Data Cadastro', 'Pedidos']]
+
+
+def agregar_celulas(linhas):
+    agregado = fragmentos_celulas(linhas).groupby(CHAVES_CUBO, observed=True, sort=False)[MEDIDAS_CUBO].sum()
+    return _com_inicio_mes(agregado.reset_index())
+
+
+def agregar_pedidos(linhas):
+    # Pedidos distintos por cliente e mês: somam sem dupla contagem em qualquer recorte
+    agregado = linhas.groupby(CHAVES_PEDIDOS, observed=True, sort=False).agg(
+        Pedidos=('Numero Pedido', 'nunique')
+    )
+    return _com_inicio_mes(agregado.reset_index())
+
+
+# MESES COMPLETOS DENTRO DO PERÍODO
+def _meses_completos(inicio, fim):
+    primeiro = inicio.normalize() if inicio.day == 1 else inicio.normalize() + pd.offsets.MonthBegin(1)
+    ultimo = fim.normalize().replace(day=1)
+    if (fim + pd.Timedelta(days=1)).day != 1:
+        ultimo -= pd.offsets.MonthBegin(1)
+    return primeiro, ultimo
+
+
+class CuboVendas:
+    """Cubo de vendas materializado na carga, com o mesmo índice de grupo/cliente da base.
+
+    Uma consulta por período usa as células dos meses inteiros e completa com as
+    linhas brutas (em forma de fragmento) só dos meses das pontas cortados ao meio.
+    """
+
+    def __init__(self, indice):
+        self._indice = indice
+        self.celulas = IndiceClientes(agregar_celulas(indice.dados))
+        self.pedidos = IndiceClientes(agregar_pedidos(indice.dados))
+
+    def _consultar(self, tabela, fragmentos, inicio, fim, filtro):
+        inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+        primeiro, ultimo = _meses_completos(inicio, fim)
+
+        if primeiro > ultimo:
+            # Período menor que um mês inteiro: tudo vem das linhas brutas
+            return fragmentos(self._indice.fatia(inicio=inicio, fim=fim, **filtro))
+
+        partes = [tabela.fatia(inicio=primeiro, fim=ultimo, **filtro)]
+        if inicio < primeiro:
+            partes.append(fragmentos(self._indice.fatia(inicio=inicio, fim=primeiro - pd.Timedelta(1, 'ns'), **filtro)))
+        depois_do_ultimo = ultimo + pd.offsets.MonthBegin(1)
+        if fim >= depois_do_ultimo:
+            partes.append(fragmentos(self._indice.fatia(inicio=depois_do_ultimo, fim=fim, **filtro)))
+
+        partes = [p for p in partes if not p.empty] or partes[:1]
+        return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+    def consultar(self, inicio, fim, codigo_cliente=None, codigo_grupo=None):
+        """Células do cliente (ou grupo) no período [inicio, fim], prontas para somar por qualquer chave."""
+        filtro = {'codigo_cliente': codigo_cliente, 'codigo_grupo': codigo_grupo}
+        return self._consultar(self.celulas, fragmentos_celulas, inicio, fim, filtro)
+
+    def consultar_pedidos(self, inicio, fim, codigo_cliente=None, codigo_grupo=None):
+        filtro = {'codigo_cliente': codigo_cliente, 'codigo_grupo': codigo_grupo}
+        return self._consultar(self.pedidos, fragmentos_pedidos, inicio, fim, filtro)
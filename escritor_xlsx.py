@@ -0,0 +1,124 @@
+import os
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from leitor_xlsx import ORIGEM_EXCEL
+
+# PARTES FIXAS DO PACOTE (uma planilha, estilo 1 = data dd/mm/aaaa nativa)
+TIPOS_CONTEUDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+RELACOES_PACOTE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+RELACOES_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _workbook(sheet_name):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+# CÉLULAS, COLUNA A COLUNA
+def _letra_coluna(indice):
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _texto(referencia, valor):
+    return f'<c r="{referencia}" t="inlineStr"><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+def _celulas(serie, letra, primeira_linha):
+    """XML de cada célula da coluna; vazio onde não há valor (NaN, NaT, None), como no to_excel.
+
+    Cada célula leva a referência (A2, B2...): sem ela, uma célula vazia deslocaria as seguintes.
+    """
+    linhas = range(primeira_linha, primeira_linha + len(serie))
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return [f'<c r="{letra}{n}" t="b"><v>{int(v)}</v></c>' for n, v in zip(linhas, serie.tolist())]
+    if pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        dias = (serie.dt.tz_localize(None) if serie.dt.tz else serie) - pd.Timestamp(ORIGEM_EXCEL)
+        seriais = (dias / pd.Timedelta(days=1)).to_numpy()
+        return ['' if np.isnan(v) else f'<c r="{letra}{n}" s="1"><v>{v!r}</v></c>' for n, v in zip(linhas, seriais.tolist())]
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        valores = serie.to_numpy()
+        if valores.dtype.kind == 'f':
+            return ['' if not np.isfinite(v) else f'<c r="{letra}{n}"><v>{v!r}</v></c>' for n, v in zip(linhas, valores.tolist())]
+        return [f'<c r="{letra}{n}"><v>{v}</v></c>' for n, v in zip(linhas, valores.tolist())]
+    return ['' if pd.isnull(v) else _texto(f'{letra}{n}', v) for n, v in zip(linhas, serie.tolist())]
+
+
+# GRAVAÇÃO EM STREAMING
+def gravar_xlsx(df, caminho, sheet_name='Sheet1', tamanho_bloco=20000):
+    """Grava `df` (sem o índice) em xlsx, como o to_excel, escrevendo o XML da planilha direto no zip.
+
+    Bloco a bloco e coluna a coluna: nenhuma pasta de trabalho é montada em memória,
+    e o arquivo final só aparece quando está completo.
+    """
+    caminho = Path(caminho)
+    letras = [_letra_coluna(i) for i in range(df.shape[1])]
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    with zipfile.ZipFile(temporario, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+        arquivo_zip.writestr('[Content_Types].xml', TIPOS_CONTEUDO)
+        arquivo_zip.writestr('_rels/.rels', RELACOES_PACOTE)
+        arquivo_zip.writestr('xl/workbook.xml', _workbook(sheet_name))
+        arquivo_zip.writestr('xl/_rels/workbook.xml.rels', RELACOES_WORKBOOK)
+        arquivo_zip.writestr('xl/styles.xml', ESTILOS)
+
+        with arquivo_zip.open('xl/worksheets/sheet1.xml', 'w') as planilha:
+            planilha.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                '<row r="1">' + ''.join(_texto(f'{letra}1', coluna) for letra, coluna in zip(letras, df.columns)) + '</row>'
+            ).encode('utf-8'))
+            for inicio in range(0, len(df), tamanho_bloco):
+                bloco = df.iloc[inicio:inicio + tamanho_bloco]
+                colunas = [_celulas(bloco.iloc[:, i], letra, inicio + 2) for i, letra in enumerate(letras)]
+                linhas = ''.join(
+                    f'<row r="{n}">' + ''.join(celulas) + '</row>' for n, celulas in enumerate(zip(*colunas), start=inicio + 2)
+                )
+                planilha.write(linhas.encode('utf-8'))
+            planilha.write(b'</sheetData></worksheet>')
+    os.replace(temporario, caminho)
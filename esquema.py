@@ -0,0 +1,108 @@
+import pandas as pd
+import pyarrow as pa
+
+from colunas_derivadas import TIPOS_ARROW_DERIVADOS
+
+COLUNAS_CODIGO = [
+    'Codigo Cliente', 'Codigo Grupo Cliente', 'Codigo Representante',
+    'Codigo Supervisor', 'Numero Pedido', 'Codigo Linha', 'Referencia'
+]
+# Cliente e grupo nunca ficam nulos: sem código viram 'NAN', como no astype(str).str.upper()
+# que os apps usavam, e LabelEncoder e groupby só veem texto
+COLUNAS_CODIGO_PREENCHIDAS = ['Codigo Cliente', 'Codigo Grupo Cliente']
+CODIGO_AUSENTE = 'NAN'
+COLUNAS_DATA = ['Data Cadastro', 'Data Ultima Compra']
+COLUNAS_NUMERICAS = ['Prazo Medio', 'Qtd Venda', 'Vlr Venda']
+COLUNAS_INTEIRAS = ['Qtd Venda']
+
+# Texto que se repete muito entre as linhas: vira categoria (códigos + dicionário)
+COLUNAS_CATEGORIA = COLUNAS_CODIGO + ['Razao Social', 'Grupo Cliente', 'Linha', 'Semestre', 'Colecao']
+# Valores monetários ficam em float64 para as somas não perderem centavos
+COLUNAS_FLOAT32 = ['Prazo Medio']
+
+
+# NORMALIZAÇÃO DOS TIPOS
+def _texto_codigo(serie):
+    # Códigos lidos como número viram "10002.0"; volta para o inteiro antes de converter
+    def converter(valor):
+        if pd.isnull(valor):
+            return None
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        return str(valor).strip().upper()
+    return serie.map(converter)
+
+
+def normalizar_tipos(df):
+    for coluna in COLUNAS_CODIGO:
+        if coluna in df.columns:
+            df[coluna] = _texto_codigo(df[coluna])
+            if coluna in COLUNAS_CODIGO_PREENCHIDAS:
+                df[coluna] = df[coluna].fillna(CODIGO_AUSENTE)
+    for coluna in COLUNAS_DATA:
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+    for coluna in COLUNAS_NUMERICAS:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], errors='coerce')
+            if coluna in COLUNAS_INTEIRAS:
+                df[coluna] = df[coluna].fillna(0).astype('int64')
+    for coluna in df.columns.difference(COLUNAS_CODIGO + COLUNAS_DATA + COLUNAS_NUMERICAS):
+        if df[coluna].dtype == object:
+            df[coluna] = df[coluna].map(lambda v: None if pd.isnull(v) else str(v))
+    return df
+
+
+# TIPOS EM MEMÓRIA
+def aplicar_esquema(df):
+    for coluna in COLUNAS_CATEGORIA:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('category')
+    for coluna in COLUNAS_INTEIRAS:
+        if coluna in df.columns:
+            df[coluna] = pd.to_numeric(df[coluna], downcast='integer')
+    for coluna in COLUNAS_FLOAT32:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('float32')
+    return df
+
+
+def relatorio_memoria(antes, depois):
+    relatorio = pd.DataFrame({
+        'Tipo Antes': antes.dtypes.astype(str),
+        'Tipo Depois': depois.dtypes.astype(str),
+        'Bytes Antes': antes.memory_usage(deep=True, index=False),
+        'Bytes Depois': depois.memory_usage(deep=True, index=False),
+    })
+    relatorio.loc['TOTAL', ['Bytes Antes', 'Bytes Depois']] = relatorio[['Bytes Antes', 'Bytes Depois']].sum()
+    relatorio['Redução (%)'] = (1 - relatorio['Bytes Depois'] / relatorio['Bytes Antes']) * 100
+    return relatorio
+
+
+# ESQUEMA ARROW FIXO, PARA QUE TODOS OS BLOCOS GRAVEM COM OS MESMOS TIPOS
+def esquema_arrow(colunas):
+    campos = []
+    for coluna in colunas:
+        if coluna in TIPOS_ARROW_DERIVADOS:
+            tipo = TIPOS_ARROW_DERIVADOS[coluna]
+        elif coluna in COLUNAS_DATA:
+            tipo = pa.timestamp('ns')
+        elif coluna in COLUNAS_INTEIRAS:
+            tipo = pa.int64()
+        elif coluna in COLUNAS_NUMERICAS:
+            tipo = pa.float64()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(coluna, tipo))
+    return pa.schema(campos)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from leitor_xlsx import ler_xlsx
+
+    antes = ler_xlsx(sys.argv[1])
+    depois = aplicar_esquema(antes.copy())
+    pd.set_option('display.width', 160)
+    print(relatorio_memoria(antes, depois).round(1))
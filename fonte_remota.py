@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# CACHE EM DISCO COMPARTILHADO POR TODOS OS PROCESSOS DO SERVIDOR
+PASTA_CACHE_REMOTO = Path(__file__).resolve().parent / ".cache_remoto"
+
+
+def _caminhos_cache(url, pasta):
+    chave = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return Path(pasta) / f"{chave}.bin", Path(pasta) / f"{chave}.json"
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+    temporario.write_bytes(conteudo)
+    os.replace(temporario, caminho)
+
+
+def baixar_com_cache(url, pasta=PASTA_CACHE_REMOTO, timeout=30):
+    """Devolve o caminho local do conteúdo de `url`, revalidando com ETag/If-Modified-Since.
+
+    Se a fonte não mudou, o custo é uma requisição com resposta 304. A cópia em
+    disco só substitui a fonte quando o servidor não responde (falha de conexão);
+    uma resposta de erro do servidor (404, 403, 500...) é levantada como HTTPError.
+    """
+    caminho_dados, caminho_meta = _caminhos_cache(url, pasta)
+    caminho_dados.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = {}
+    if caminho_dados.exists() and caminho_meta.exists():
+        meta = json.loads(caminho_meta.read_text(encoding="utf-8"))
+
+    requisicao = urllib.request.Request(url)
+    if meta.get('etag'):
+        requisicao.add_header('If-None-Match', meta['etag'])
+    if meta.get('last_modified'):
+        requisicao.add_header('If-Modified-Since', meta['last_modified'])
+
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            conteudo = resposta.read()
+            novo_meta = {
+                'url': url,
+                'etag': resposta.headers.get('ETag'),
+                'last_modified': resposta.headers.get('Last-Modified'),
+            }
+    except urllib.error.HTTPError as erro:
+        # O urllib entrega o 304 (não modificado) como HTTPError
+        if erro.code == 304 and meta:
+            return caminho_dados
+        raise
+    except (urllib.error.URLError, TimeoutError):
+        # Sem resposta do servidor: vale a última cópia baixada
+        if meta:
+            return caminho_dados
+        raise
+
+    _gravar_atomico(caminho_dados, conteudo)
+    _gravar_atomico(caminho_meta, json.dumps(novo_meta).encode("utf-8"))
+    return caminho_dados
+
+
+def baixar_varios(urls, pasta=PASTA_CACHE_REMOTO, timeout=30):
+    with ThreadPoolExecutor(max_workers=len(urls) or 1) as pool:
+        return list(pool.map(lambda url: baixar_com_cache(url, pasta, timeout), urls))
+
+
+def ler_csvs(caminhos, **kwargs):
+    # Lê direto dos arquivos em cache, sem passar os bytes pela memória de novo
+    return pd.concat([pd.read_csv(caminho, **kwargs) for caminho in caminhos], ignore_index=True)
+
+
+def ler_csvs_remotos(urls, pasta=PASTA_CACHE_REMOTO, timeout=30, **kwargs):
+    return ler_csvs(baixar_varios(urls, pasta, timeout), **kwargs)
+
+
+# VERIFICAÇÃO CONTRA UM SERVIDOR LOCAL (python fonte_remota.py)
+def verificar_cache_local():
+    """Baixa de um http.server local e confere os caminhos 200, 304 e 404 do cache."""
+    import tempfile
+    import threading
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    class Servidor(SimpleHTTPRequestHandler):
+        respostas = []
+
+        def send_response(self, code, message=None):
+            self.respostas.append(code)
+            super().send_response(code, message)
+
+        def log_message(self, *args):
+            pass
+
+    with tempfile.TemporaryDirectory() as raiz:
+        raiz = Path(raiz)
+        (raiz / "vendas.csv").write_text("a,b\n1,2\n", encoding="utf-8")
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), partial(Servidor, directory=str(raiz / "")))
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+        try:
+            caminho = baixar_com_cache(f"{base}/vendas.csv", raiz / "cache")
+            assert Servidor.respostas[-1] == 200 and caminho.read_bytes() == b"a,b\n1,2\n"
+
+            assert baixar_com_cache(f"{base}/vendas.csv", raiz / "cache") == caminho
+            assert Servidor.respostas[-1] == 304
+
+            # 404 com cópia em disco não pode virar a cópia antiga
+            (raiz / "vendas.csv").unlink()
+            try:
+                baixar_com_cache(f"{base}/vendas.csv", raiz / "cache")
+            except urllib.error.HTTPError as erro:
+                assert erro.code == 404
+            else:
+                raise AssertionError("404 serviu o cache")
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+        # Servidor fora do ar: aí sim a cópia em disco é usada
+        (raiz / "vendas.csv").write_text("a,b\n3,4\n", encoding="utf-8")
+        assert baixar_com_cache(f"{base}/vendas.csv", raiz / "cache", timeout=2) == caminho
+    return Servidor.respostas
+
+
+if __name__ == "__main__":
+    print("respostas do servidor:", verificar_cache_local())
+    print("ok: 200 baixa, 304 usa o cache, 404 levanta HTTPError, sem conexão usa o cache")
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from vetores import NAT, codigos_e_rotulos
+
+# ORDEM FÍSICA DA TABELA: grupo, cliente e data do pedido
+COLUNA_GRUPO = 'Codigo Grupo Cliente'
+COLUNA_CLIENTE = 'Codigo Cliente'
+COLUNA_DATA = 'Data Cadastro'
+
+_FIM = np.iinfo(np.int64).max
+
+
+# CHAVES DE ORDENAÇÃO (inteiros; nulos vão para o fim, como no sort_values)
+def _ordem(serie):
+    valores, rotulos = codigos_e_rotulos(serie)
+    return np.where(valores < 0, _FIM, valores), rotulos
+
+
+def _datas(serie):
+    datas = serie.to_numpy(dtype='datetime64[ns]').view('int64')
+    return np.where(datas == NAT, _FIM, datas)
+
+
+def _chaves(df):
+    grupos, rotulos_grupo = _ordem(df[COLUNA_GRUPO])
+    clientes, rotulos_cliente = _ordem(df[COLUNA_CLIENTE])
+    return grupos, clientes, _datas(df[COLUNA_DATA]), rotulos_grupo, rotulos_cliente
+
+
+def _ja_ordenado(grupos, clientes, datas):
+    dg, dc, dd = np.diff(grupos), np.diff(clientes), np.diff(datas)
+    return bool(np.all((dg > 0) | ((dg == 0) & ((dc > 0) | ((dc == 0) & (dd >= 0))))))
+
+
+def ordenar_para_indice(df):
+    """Reordena as linhas por grupo, cliente e data (não faz nada se já estiverem assim)."""
+    if not {COLUNA_GRUPO, COLUNA_CLIENTE, COLUNA_DATA} <= set(df.columns):
+        return df
+    grupos, clientes, datas, _, _ = _chaves(df)
+    if _ja_ordenado(grupos, clientes, datas):
+        return df
+    return df.take(np.lexsort((datas, clientes, grupos))).reset_index(drop=True)
+
+
+# ÍNDICE
+class IndiceClientes:
+    """Fatias de grupo/cliente por deslocamento, sem máscara sobre a tabela inteira.
+
+    Cada par (grupo, cliente) ocupa um trecho contínuo [início, fim) da tabela
+    ordenada, com as datas em ordem dentro dele; o período é recortado com
+    `searchsorted` em cada trecho.
+    """
+
+    def __init__(self, df):
+        self.dados = ordenar_para_indice(df)
+        grupos, clientes, datas, self._rotulos_grupo, self._rotulos_cliente = _chaves(self.dados)
+        self._datas = datas
+
+        # Tabela de deslocamentos: um trecho por par (grupo, cliente)
+        quebras = np.flatnonzero((np.diff(grupos) != 0) | (np.diff(clientes) != 0)) + 1
+        self._inicio = np.r_[0, quebras].astype('int64') if len(grupos) else np.array([], dtype='int64')
+        self._fim = np.r_[quebras, len(grupos)].astype('int64') if len(grupos) else np.array([], dtype='int64')
+        self._grupo_trecho = grupos[self._inicio]
+        self._cliente_trecho = clientes[self._inicio]
+
+        # Trechos de um cliente (normalmente um só), achados por busca binária
+        self._trechos_por_cliente = np.argsort(self._cliente_trecho, kind='stable')
+        self._clientes_ordenados = self._cliente_trecho[self._trechos_por_cliente]
+
+    def _codigo(self, rotulos, valor):
+        posicao = rotulos.get_indexer([valor])[0]
+        return None if posicao < 0 else posicao
+
+    def _trechos_grupo(self, codigo_grupo):
+        codigo = self._codigo(self._rotulos_grupo, codigo_grupo)
+        if codigo is None:
+            return np.array([], dtype='int64')
+        a = np.searchsorted(self._grupo_trecho, codigo, side='left')
+        b = np.searchsorted(self._grupo_trecho, codigo, side='right')
+        return np.arange(a, b)
+
+    def _trechos_cliente(self, codigo_cliente):
+        codigo = self._codigo(self._rotulos_cliente, codigo_cliente)
+        if codigo is None:
+            return np.array([], dtype='int64')
+        a = np.searchsorted(self._clientes_ordenados, codigo, side='left')
+        b = np.searchsorted(self._clientes_ordenados, codigo, side='right')
+        return np.sort(self._trechos_por_cliente[a:b])
+
+    def posicoes(self, codigo_cliente=None, codigo_grupo=None, inicio=None, fim=None):
+        # Cliente tem prioridade sobre grupo, como no filtro original dos apps
+        # Período fechado [inicio, fim]; datas nulas ficam fora, como na comparação com NaT
+        menor = np.iinfo(np.int64).min if inicio is None else pd.Timestamp(inicio).value
+        maior = _FIM - 1 if fim is None else pd.Timestamp(fim).value
+
+        if codigo_cliente:
+            trechos = self._trechos_cliente(codigo_cliente)
+        else:
+            trechos = self._trechos_grupo(codigo_grupo) if codigo_grupo else np.arange(len(self._inicio))
+            if len(trechos) > 1:
+                # Trechos de um grupo são vizinhos: um só bloco, filtrado de uma vez
+                a, b = self._inicio[trechos[0]], self._fim[trechos[-1]]
+                datas = self._datas[a:b]
+                return a + np.flatnonzero((datas >= menor) & (datas <= maior))
+
+        partes = []
+        for t in trechos:
+            datas = self._datas[self._inicio[t]:self._fim[t]]
+            a = self._inicio[t] + np.searchsorted(datas, menor, side='left')
+            b = self._inicio[t] + np.searchsorted(datas, maior, side='right')
+            if b > a:
+                partes.append(np.arange(a, b))
+        return np.concatenate(partes) if partes else np.array([], dtype='int64')
+
+    def fatia(self, codigo_cliente=None, codigo_grupo=None, inicio=None, fim=None):
+        """Linhas do cliente (ou do grupo) no período, copiando só o que foi selecionado."""
+        return self.dados.take(self.posicoes(codigo_cliente, codigo_grupo, inicio, fim))
+
+    def intervalo_datas(self):
+        return self.dados['Data Cadastro'].min(), self.dados['Data Cadastro'].max()
+
+    def colunas(self, nomes):
+        # Mesma interface do ArmazemSQLite: só as colunas pedidas da base inteira
+        return self.dados[nomes]
+
+    def clientes(self):
+        return self.dados[['Codigo Cliente', 'Razao Social', 'Codigo Grupo Cliente', 'Grupo Cliente']]
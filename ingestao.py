@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from leitor_xlsx import ler_filtros_exportacao, ler_xlsx_em_blocos
+from colunas_derivadas import aplicar_derivadas, completar_derivadas
+from esquema import aplicar_esquema, esquema_arrow
+
+PASTA_BASE = Path(__file__).resolve().parent
+PASTA_DADOS = PASTA_BASE / "DADOS"
+PASTA_DATASET = PASTA_BASE / ".dataset"
+# Fica dentro do dataset; o "_" faz o pyarrow ignorar o arquivo na leitura
+ARQUIVO_MARCAS = "_marcas.json"
+
+# Exportações do ERP: "<supervisor> - <período>.xlsx"
+PADRAO_EXPORTACAO = re.compile(r'^(\d+)\s*-')
+PARTICIONAMENTO = ds.partitioning(
+    pa.schema([('Codigo Supervisor', pa.string()), ('Ano', pa.int32())]),
+    flavor='hive'
+)
+
+
+# FILTROS DO CABEÇALHO DA EXPORTAÇÃO
+def ler_janela_exportacao(caminho):
+    texto = ' '.join(ler_filtros_exportacao(caminho))
+
+    def data(padrao, formato):
+        achado = re.search(padrao, texto)
+        return datetime.strptime(achado.group(1), formato) if achado else None
+
+    return {
+        'inicio': data(r'Data Cadastro:\s*(\d{2}/\d{2}/\d{4})', '%d/%m/%Y'),
+        'fim': data(r'Data Cadastro:\s*\d{2}/\d{2}/\d{4}\s*à\s*(\d{2}/\d{2}/\d{4})', '%d/%m/%Y'),
+        'processado_em': data(r'Processado em:\s*(\d{2}/\d{2}/\d{4} \d{2}:\d{2})', '%d/%m/%Y %H:%M'),
+    }
+
+
+def listar_exportacoes(pasta=PASTA_DADOS):
+    return sorted(p for p in Path(pasta).glob("*.xlsx") if PADRAO_EXPORTACAO.match(p.name))
+
+
+# CONVERSÃO DE UM ARQUIVO (RODA NO POOL DE PROCESSOS)
+def _converter_exportacao(caminho, destino):
+    janela = ler_janela_exportacao(caminho)
+
+    linhas = 0
+    escritor = None
+    try:
+        for bloco in ler_xlsx_em_blocos(caminho):
+            bloco = aplicar_derivadas(bloco)
+            if escritor is None:
+                esquema = esquema_arrow(bloco.columns)
+                escritor = pq.ParquetWriter(destino, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+            linhas += len(bloco)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+    return {'arquivo': str(caminho), 'parquet': str(destino), 'linhas': linhas, **janela}
+
+
+# DEDUPLICAÇÃO ENTRE EXPORTAÇÕES QUE SE SOBREPÕEM
+def _deduplicar_pedidos(tabelas):
+    # Cada tabela vem com a ordem de processamento da exportação; o pedido que
+    # aparece em mais de uma fica só com as linhas da exportação mais recente
+    tabela = pa.concat_tables(tabelas)
+    df = tabela.select(['Codigo Supervisor', 'Numero Pedido', '_ordem']).to_pandas()
+    mais_recente = df.groupby(['Codigo Supervisor', 'Numero Pedido'], sort=False)['_ordem'].transform('max')
+    manter = pa.array((df['_ordem'] == mais_recente).to_numpy())
+    return tabela.filter(manter).drop(['_ordem'])
+
+
+def _com_ano(tabela):
+    # "Ano" já vem das colunas derivadas; a partição usa int32
+    ano = pc.cast(pc.year(tabela['Data Cadastro']), pa.int32())
+    if 'Ano' in tabela.column_names:
+        return tabela.set_column(tabela.column_names.index('Ano'), 'Ano', ano)
+    return tabela.append_column('Ano', ano)
+
+
+def gravar_dataset(tabela, destino=PASTA_DATASET, marcas=None):
+    destino = Path(destino)
+    temporario = Path(tempfile.mkdtemp(prefix=".dataset_", dir=destino.parent))
+    ds.write_dataset(
+        tabela, temporario, format='parquet', partitioning=PARTICIONAMENTO,
+        existing_data_behavior='overwrite_or_ignore'
+    )
+    if marcas is not None:
+        gravar_marcas(marcas, temporario)
+
+    # Troca a pasta inteira de uma vez para que leitores nunca vejam um dataset pela metade
+    antigo = destino.with_name(destino.name + ".antigo")
+    if destino.exists():
+        destino.rename(antigo)
+    temporario.rename(destino)
+    shutil.rmtree(antigo, ignore_errors=True)
+
+
+def ingerir_exportacoes(origem=PASTA_DADOS, destino=PASTA_DATASET, max_processos=None):
+    arquivos = listar_exportacoes(origem)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma exportação encontrada em {origem}")
+
+    with tempfile.TemporaryDirectory() as pasta_tmp:
+        destinos = [Path(pasta_tmp) / f"{i}.parquet" for i in range(len(arquivos))]
+        with ProcessPoolExecutor(max_workers=max_processos) as pool:
+            convertidos = list(pool.map(_converter_exportacao, arquivos, destinos))
+
+        # Exportações mais antigas primeiro: a maior ordem vence na deduplicação
+        convertidos.sort(key=lambda c: (c['processado_em'] or datetime.min, c['fim'] or datetime.min))
+        tabelas = []
+        for ordem, convertido in enumerate(convertidos):
+            tabela = pq.read_table(convertido['parquet'])
+            tabelas.append(tabela.append_column('_ordem', pa.array([ordem] * tabela.num_rows, pa.int32())))
+
+        tabela = _com_ano(_deduplicar_pedidos(tabelas))
+
+        marcas = {}
+        for convertido, tabela_arquivo in zip(convertidos, tabelas):
+            for supervisor in pc.unique(tabela_arquivo['Codigo Supervisor']).to_pylist():
+                _avancar_marca(marcas, supervisor, None, convertido['processado_em'])
+        _marcas_da_tabela(marcas, tabela)
+        gravar_dataset(tabela, destino, marcas)
+
+    return convertidos, tabela.num_rows
+
+
+# MARCAS D'ÁGUA POR SUPERVISOR
+def carregar_marcas(pasta=PASTA_DATASET):
+    caminho = Path(pasta) / ARQUIVO_MARCAS
+    if not caminho.exists():
+        return {}
+    marcas = json.loads(caminho.read_text(encoding="utf-8"))
+    return {
+        supervisor: {chave: datetime.fromisoformat(valor) if valor else None for chave, valor in marca.items()}
+        for supervisor, marca in marcas.items()
+    }
+
+
+def gravar_marcas(marcas, pasta=PASTA_DATASET):
+    serializado = {
+        supervisor: {chave: valor.isoformat() if valor else None for chave, valor in marca.items()}
+        for supervisor, marca in marcas.items()
+    }
+    caminho = Path(pasta) / ARQUIVO_MARCAS
+    temporario = caminho.with_name("_marcas.json.tmp")
+    temporario.write_text(json.dumps(serializado, indent=2), encoding="utf-8")
+    os.replace(temporario, caminho)
+
+
+def _avancar_marca(marcas, supervisor, data_cadastro, processado_em):
+    marca = marcas.setdefault(supervisor, {'data_cadastro': None, 'processado_em': None})
+    if data_cadastro is not None and (marca['data_cadastro'] is None or data_cadastro > marca['data_cadastro']):
+        marca['data_cadastro'] = data_cadastro
+    if processado_em is not None and (marca['processado_em'] is None or processado_em > marca['processado_em']):
+        marca['processado_em'] = processado_em
+
+
+def _marcas_da_tabela(marcas, tabela):
+    maximos = tabela.group_by('Codigo Supervisor').aggregate([('Data Cadastro', 'max')])
+    for supervisor, data in zip(maximos['Codigo Supervisor'].to_pylist(), maximos['Data Cadastro_max'].to_pylist()):
+        _avancar_marca(marcas, supervisor, data, None)
+
+
+# INGESTÃO INCREMENTAL
+def _arquivos_particao(pasta, supervisor, ano):
+    particao = Path(pasta) / f"Codigo Supervisor={supervisor}" / f"Ano={ano}"
+    return particao, sorted(particao.glob("*.parquet"))
+
+
+def _esquema_particoes(destino, delta):
+    # Esquema fixo dos arquivos de partição: o do dataset gravado, sem as colunas de partição
+    if any(Path(destino).glob("Codigo Supervisor=*/Ano=*/*.parquet")):
+        esquema = ds.dataset(destino, format='parquet', partitioning=PARTICIONAMENTO).schema
+    else:
+        esquema = delta.schema
+    return pa.schema([campo for campo in esquema if campo.name not in ('Codigo Supervisor', 'Ano')])
+
+
+def _conformar(tabela, esquema):
+    # Colunas na ordem e nos tipos do esquema; a que faltar entra vazia
+    return pa.table([
+        tabela[campo.name].cast(campo.type) if campo.name in tabela.column_names else pa.nulls(tabela.num_rows, campo.type)
+        for campo in esquema
+    ], schema=esquema)
+
+
+def _regravar_particao(pasta, supervisor, ano, pedidos_substituidos, novas_linhas, esquema, janela=None):
+    """Regrava a partição sem os pedidos substituídos nem os gravados dentro de `janela`.
+
+    `janela` (início, fim exclusivo) é o trecho que a exportação cobre por inteiro: o que
+    estava gravado ali e não voltou nela foi cancelado ou excluído no ERP.
+    """
+    particao, arquivos = _arquivos_particao(pasta, supervisor, ano)
+    partes = []
+    if arquivos:
+        atual = pa.concat_tables([_conformar(pq.read_table(a), esquema) for a in arquivos])
+        remover = pc.is_in(atual['Numero Pedido'], value_set=pedidos_substituidos)
+        if janela is not None:
+            na_janela = pc.and_(
+                pc.greater_equal(atual['Data Cadastro'], pa.scalar(janela[0], atual['Data Cadastro'].type)),
+                pc.less(atual['Data Cadastro'], pa.scalar(janela[1], atual['Data Cadastro'].type)),
+            )
+            remover = pc.or_(remover, pc.fill_null(na_janela, False))
+        partes.append(atual.filter(pc.invert(pc.fill_null(remover, False))))
+    if novas_linhas is not None and novas_linhas.num_rows:
+        partes.append(_conformar(novas_linhas, esquema))
+
+    particao.mkdir(parents=True, exist_ok=True)
+    temporario = particao / ".part-0.parquet.tmp"
+    pq.write_table(pa.concat_tables(partes) if partes else esquema.empty_table(), temporario)
+    os.replace(temporario, particao / "part-0.parquet")
+    for arquivo in arquivos:
+        if arquivo.name != "part-0.parquet":
+            arquivo.unlink()
+
+
+def _janela_correcao(corte, janela, datas):
+    """Trecho [início, fim + 1 dia) do supervisor que a exportação reescreve por inteiro.
+
+    Vai do corte (marca d'água - dias de correção) até o fim da exportação; sem o
+    cabeçalho, vale o intervalo das próprias datas do supervisor no arquivo.
+    """
+    inicio = janela['inicio'] or datas.min()
+    fim = janela['fim'] or datas.max()
+    if corte is not None:
+        inicio = max(inicio, corte)
+    if pd.isna(inicio) or pd.isna(fim) or inicio > fim:
+        return None
+    return pd.Timestamp(inicio), pd.Timestamp(fim).normalize() + timedelta(days=1)
+
+
+def atualizar_incremental(arquivos, destino=PASTA_DATASET, dias_correcao=30):
+    """Acrescenta ao dataset só os pedidos novos de cada exportação.
+
+    Por supervisor, as linhas com Data Cadastro a partir de (marca d'água - `dias_correcao`)
+    são o delta: substituem por inteiro a versão já gravada dos mesmos pedidos, e o que
+    estava gravado nesse trecho e não veio na exportação sai (pedido cancelado ou excluído).
+    A decisão é linha a linha; nenhuma exportação é pulada pela data de processamento.
+    Só as partições tocadas são regravadas.
+    """
+    destino = Path(destino)
+    marcas = carregar_marcas(destino)
+    resumo = []
+
+    for caminho in arquivos:
+        janela = ler_janela_exportacao(caminho)
+        blocos = []
+        datas = {}
+        for bloco in ler_xlsx_em_blocos(caminho):
+            bloco = aplicar_derivadas(bloco)
+            for supervisor in bloco['Codigo Supervisor'].dropna().unique():
+                selecao = bloco['Codigo Supervisor'] == supervisor
+                # Intervalo de datas do supervisor no arquivo, para quando falta o cabeçalho
+                minimo, maximo = bloco.loc[selecao, 'Data Cadastro'].min(), bloco.loc[selecao, 'Data Cadastro'].max()
+                anterior = datas.get(supervisor, (minimo, maximo))
+                datas[supervisor] = (min(anterior[0], minimo), max(anterior[1], maximo))
+
+                marca = marcas.get(supervisor, {})
+                if marca.get('data_cadastro'):
+                    selecao &= bloco['Data Cadastro'] >= marca['data_cadastro'] - timedelta(days=dias_correcao)
+                if selecao.any():
+                    blocos.append(bloco[selecao])
+
+        if not datas:
+            resumo.append({'arquivo': str(caminho), 'linhas': 0, 'pedidos': 0, 'particoes': 0})
+            continue
+
+        if blocos:
+            delta = pa.Table.from_pandas(pd.concat(blocos, ignore_index=True), preserve_index=False)
+            delta = _com_ano(delta.cast(esquema_arrow(delta.column_names)))
+        else:
+            delta = None
+        esquema = _esquema_particoes(destino, delta)
+
+        particoes = 0
+        for supervisor, (minimo, maximo) in datas.items():
+            if delta is not None:
+                do_supervisor = delta.filter(pc.equal(delta['Codigo Supervisor'], supervisor))
+            else:
+                do_supervisor = None
+            if do_supervisor is not None and do_supervisor.num_rows == 0:
+                do_supervisor = None
+            pedidos = pc.unique(do_supervisor['Numero Pedido']) if do_supervisor is not None else pa.array([], pa.string())
+
+            marca = marcas.get(supervisor, {})
+            corte = marca['data_cadastro'] - timedelta(days=dias_correcao) if marca.get('data_cadastro') else None
+            trecho = _janela_correcao(corte, janela, pd.Series([minimo, maximo]))
+
+            # Uma correção pode ter mudado a data do pedido: as partições a partir do
+            # ano do corte também perdem as versões antigas dos pedidos do delta
+            anos_delta = set(pc.unique(do_supervisor['Ano']).to_pylist()) if do_supervisor is not None else set()
+            candidatos = [ano for ano in (min(anos_delta, default=None), corte and corte.year, trecho and trecho[0].year) if ano]
+            if not candidatos:
+                continue
+            primeiro_ano = min(candidatos)
+            anos_existentes = [
+                int(p.name.split("=", 1)[1])
+                for p in (destino / f"Codigo Supervisor={supervisor}").glob("Ano=*")
+            ]
+            anos = sorted(anos_delta | {a for a in anos_existentes if a >= primeiro_ano})
+
+            for ano in anos:
+                novas = do_supervisor.filter(pc.equal(do_supervisor['Ano'], ano)) if do_supervisor is not None else None
+                _regravar_particao(destino, supervisor, ano, pedidos, novas, esquema, trecho)
+                particoes += 1
+
+            maior_data = pc.max(do_supervisor['Data Cadastro']).as_py() if do_supervisor is not None else None
+            _avancar_marca(marcas, supervisor, maior_data, janela['processado_em'])
+
+        gravar_marcas(marcas, destino)
+        resumo.append({
+            'arquivo': str(caminho), 'linhas': delta.num_rows if delta is not None else 0,
+            'pedidos': len(pc.unique(delta['Numero Pedido'])) if delta is not None else 0, 'particoes': particoes,
+        })
+
+    return resumo
+
+
+# LEITURA DO DATASET
+def filtro_particoes(supervisores=None, anos=None):
+    # Filtros nas colunas de partição: só as pastas necessárias são abertas
+    filtro = None
+    if supervisores is not None:
+        filtro = ds.field('Codigo Supervisor').isin([str(s) for s in supervisores])
+    if anos is not None:
+        filtro_anos = ds.field('Ano').isin([int(a) for a in anos])
+        filtro = filtro_anos if filtro is None else filtro & filtro_anos
+    return filtro
+
+
+def carregar_dataset(pasta=PASTA_DATASET, supervisores=None, anos=None, colunas=None):
+    dataset = ds.dataset(pasta, format='parquet', partitioning=PARTICIONAMENTO)
+    filtro = filtro_particoes(supervisores, anos)
+    return aplicar_esquema(completar_derivadas(dataset.to_table(columns=colunas, filter=filtro).to_pandas()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingere as exportações do ERP em um dataset particionado")
+    parser.add_argument("--origem", default=str(PASTA_DADOS))
+    parser.add_argument("--destino", default=str(PASTA_DATASET))
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--incremental", nargs="+", metavar="ARQUIVO",
+                        help="acrescenta só os pedidos novos destes arquivos ao dataset existente")
+    parser.add_argument("--dias-correcao", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.incremental:
+        for r in atualizar_incremental(args.incremental, args.destino, args.dias_correcao):
+            print(f"{Path(r['arquivo']).name}: {r['linhas']} linhas, {r['pedidos']} pedidos, {r['particoes']} partições regravadas")
+        raise SystemExit(0)
+
+    convertidos, total = ingerir_exportacoes(args.origem, args.destino, args.processos)
+    for c in convertidos:
+        print(f"{Path(c['arquivo']).name}: {c['linhas']} linhas (processado em {c['processado_em']})")
+    print(f"Dataset gravado em {args.destino}: {total} linhas")
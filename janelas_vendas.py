@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from colecoes import inicio_colecao
+from vetores import DIA, NAT, codigos_e_rotulos
+
+COLUNAS_JANELAS = ['Codigo Grupo Cliente', 'Codigo Cliente', 'Data Cadastro', 'Qtd Venda', 'Vlr Venda']
+
+
+def _dia(data):
+    return pd.Timestamp(data).value // DIA
+
+
+# SOMAS ACUMULADAS POR CHAVE
+class _SomasAcumuladas:
+    """Pares e valor acumulados dia a dia de cada chave, em arrays planos.
+
+    As entradas de uma chave são contíguas e em ordem de dia; com a soma acumulada
+    global P, o total de [a, b) dentro do trecho é P[b] - P[a].
+    """
+
+    def __init__(self, chaves, rotulos, dias, pares, valores):
+        self._rotulos = rotulos
+        ordem = np.lexsort((dias, chaves))
+        chaves, dias = chaves[ordem], dias[ordem]
+
+        # Um ponto por (chave, dia): soma as linhas do mesmo dia
+        novo = np.r_[True, (np.diff(chaves) != 0) | (np.diff(dias) != 0)] if len(chaves) else np.array([], bool)
+        pontos = np.flatnonzero(novo)
+        self._dias = dias[pontos]
+        self._pares = np.r_[0.0, np.cumsum(np.add.reduceat(pares[ordem], pontos))] if len(pontos) else np.zeros(1)
+        self._valores = np.r_[0.0, np.cumsum(np.add.reduceat(valores[ordem], pontos))] if len(pontos) else np.zeros(1)
+
+        chaves = chaves[pontos]
+        quebras = np.flatnonzero(np.diff(chaves)) + 1
+        self._inicio = np.r_[0, quebras].astype('int64') if len(chaves) else np.array([], dtype='int64')
+        self._fim = np.r_[quebras, len(chaves)].astype('int64') if len(chaves) else np.array([], dtype='int64')
+        self._chave_trecho = chaves[self._inicio]
+
+    def somar(self, codigo, inicio, fim):
+        # Duas buscas binárias: uma para achar a chave, outra para cada ponta da janela
+        posicao = self._rotulos.get_indexer([codigo])[0]
+        t = np.searchsorted(self._chave_trecho, posicao)
+        if posicao < 0 or t == len(self._chave_trecho) or self._chave_trecho[t] != posicao:
+            return 0, 0.0
+        a, b = self._inicio[t], self._fim[t]
+        dias = self._dias[a:b]
+        i = a + np.searchsorted(dias, _dia(inicio), side='left')
+        j = a + np.searchsorted(dias, _dia(fim), side='right')
+        return int(round(self._pares[j] - self._pares[i])), float(self._valores[j] - self._valores[i])
+
+
+# MOTOR DE JANELAS
+class JanelasVendas:
+    """Pares e valor de qualquer janela de datas de um cliente ou grupo em O(log n).
+
+    Montado uma vez na carga; uma comparação entre períodos não relê linhas de venda.
+    """
+
+    def __init__(self, dados):
+        dias = dados['Data Cadastro'].to_numpy(dtype='datetime64[ns]').view('int64')
+        com_data = dias != NAT
+        dias = dias // DIA
+        pares = np.nan_to_num(dados['Qtd Venda'].to_numpy(dtype='float64'))
+        valores = np.nan_to_num(dados['Vlr Venda'].to_numpy(dtype='float64'))
+
+        def somas(coluna):
+            codigos, rotulos = codigos_e_rotulos(dados[coluna])
+            usar = com_data & (codigos >= 0)
+            return _SomasAcumuladas(codigos[usar], rotulos, dias[usar], pares[usar], valores[usar])
+
+        self._grupos = somas('Codigo Grupo Cliente')
+        self._clientes = somas('Codigo Cliente')
+
+    def total(self, inicio, fim, codigo_cliente=None, codigo_grupo=None):
+        """(pares, valor) no período fechado [inicio, fim]; cliente tem prioridade sobre grupo."""
+        if codigo_cliente:
+            return self._clientes.somar(str(codigo_cliente), inicio, fim)
+        if codigo_grupo:
+            return self._grupos.somar(str(codigo_grupo), inicio, fim)
+        return 0, 0.0
+
+    def comparar(self, janelas, codigo_cliente=None, codigo_grupo=None):
+        return comparar_janelas(self.total, janelas, codigo_cliente, codigo_grupo)
+
+
+def comparar_janelas(total, janelas, codigo_cliente=None, codigo_grupo=None):
+    """Uma linha por janela com os totais de `total(inicio, fim, codigo_cliente, codigo_grupo)`."""
+    linhas = []
+    for nome, inicio, fim in janelas:
+        pares, valor = total(inicio, fim, codigo_cliente, codigo_grupo)
+        linhas.append({
+            'Período': nome,
+            'De': inicio.strftime('%d/%m/%Y'),
+            'Até': fim.strftime('%d/%m/%Y'),
+            'Pares': pares,
+            'Valor (R$)': valor,
+        })
+    return pd.DataFrame(linhas)
+
+
+# JANELAS USUAIS
+def mesmo_periodo_ano_anterior(inicio, fim):
+    return pd.Timestamp(inicio) - pd.DateOffset(years=1), pd.Timestamp(fim) - pd.DateOffset(years=1)
+
+
+def janelas_padrao(referencia):
+    """Semestre e ano móveis terminando em `referencia`, a coleção até a data e os comparativos."""
+    fim = pd.Timestamp(referencia).normalize()
+    dia = pd.Timedelta(days=1)
+    seis_meses = fim - pd.DateOffset(months=6)
+    doze_meses = fim - pd.DateOffset(months=12)
+    colecao = inicio_colecao(fim)
+    return [
+        ('Últimos 6 meses', seis_meses + dia, fim),
+        ('6 meses anteriores', doze_meses + dia, seis_meses),
+        ('Últimos 12 meses', doze_meses + dia, fim),
+        ('12 meses do ano anterior', *mesmo_periodo_ano_anterior(doze_meses + dia, fim)),
+        ('Coleção até a data', colecao, fim),
+        ('Mesma coleção no ano anterior', *mesmo_periodo_ano_anterior(colecao, fim)),
+    ]
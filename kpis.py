@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from vetores import NAT, codigos_e_rotulos
+
+
+# RESULTADO
+@dataclass(frozen=True)
+class KpisAnalise:
+    """Números do cabeçalho da análise, calculados uma vez e lidos pelos cards, RFV e PDF."""
+
+    linhas: int
+    qtd_venda: int
+    vlr_venda: float
+    primeira_data: pd.Timestamp
+    ultima_data: pd.Timestamp
+    ultima_compra: pd.Timestamp  # NaT se nenhuma linha tem 'Data Ultima Compra'
+    dias_com_pedido: int  # datas de pedido distintas: a frequência do RFV
+    lojas: int
+    melhor_mes: int  # mês (1-12) com mais linhas de venda; 0 se não há datas
+    nome_grupo: str
+
+    def recencia(self, hoje):
+        return (pd.Timestamp(hoje) - self.ultima_compra).days if pd.notnull(self.ultima_compra) else 999
+
+    @property
+    def ultima_compra_texto(self):
+        return self.ultima_compra.strftime('%d/%m/%Y') if pd.notnull(self.ultima_compra) else 'Sem compras'
+
+    @property
+    def periodo_texto(self):
+        return f"{self.primeira_data.strftime('%d/%m/%Y')} até {self.ultima_data.strftime('%d/%m/%Y')}"
+
+
+# CÁLCULO
+def _datas(serie):
+    return serie.to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def _timestamp(valores, reducao):
+    return pd.Timestamp(reducao(valores)) if len(valores) else pd.NaT
+
+
+def _distintos(serie):
+    codigos, _ = codigos_e_rotulos(serie)
+    codigos = codigos[codigos >= 0]
+    return int(np.count_nonzero(np.bincount(codigos))) if len(codigos) else 0
+
+
+def calcular_kpis(dados):
+    """Todos os KPIs do recorte numa só leitura de cada coluna, só com reduções do NumPy.
+
+    Substitui os max/min/sum/mode/nunique feitos um a um sobre o DataFrame filtrado.
+    """
+    cadastro = _datas(dados['Data Cadastro'])
+    cadastro = cadastro[cadastro != NAT]
+    compra = _datas(dados['Data Ultima Compra'])
+    compra = compra[compra != NAT]
+
+    if len(cadastro):
+        # Mês de cada data direto do inteiro em ns; o empate fica com o menor mês, como no mode()
+        meses = cadastro.view('datetime64[ns]').astype('datetime64[M]').astype('int64') % 12
+        melhor_mes = int(np.bincount(meses, minlength=12).argmax()) + 1
+    else:
+        melhor_mes = 0
+
+    return KpisAnalise(
+        linhas=len(dados),
+        qtd_venda=int(np.nansum(dados['Qtd Venda'].to_numpy(dtype='float64'))),
+        vlr_venda=float(np.nansum(dados['Vlr Venda'].to_numpy(dtype='float64'))),
+        primeira_data=_timestamp(cadastro, np.min),
+        ultima_data=_timestamp(cadastro, np.max),
+        ultima_compra=_timestamp(compra, np.max),
+        dias_com_pedido=int(np.unique(cadastro).size),
+        lojas=_distintos(dados['Codigo Cliente']),
+        melhor_mes=melhor_mes,
+        nome_grupo=dados['Grupo Cliente'].iloc[0] if len(dados) else '',
+    )
@@ -0,0 +1,209 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+from esquema import normalizar_tipos
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# numFmtId nativos do Excel que representam datas/horas
+FORMATOS_DATA_NATIVOS = set(range(14, 23)) | {45, 46, 47}
+ORIGEM_EXCEL = '1899-12-30'
+
+# ESTRUTURA DO ARQUIVO
+def _caminho_planilha(arquivo_zip, sheet_name):
+    workbook = ET.fromstring(arquivo_zip.read('xl/workbook.xml'))
+    rels = ET.fromstring(arquivo_zip.read('xl/_rels/workbook.xml.rels'))
+    destinos = {r.get('Id'): r.get('Target') for r in rels.iter(f'{NS_PKG_REL}Relationship')}
+
+    planilhas = list(workbook.iter(f'{NS}sheet'))
+    if sheet_name is None:
+        escolhida = planilhas[0]
+    else:
+        escolhida = next((p for p in planilhas if p.get('name') == sheet_name), None)
+        if escolhida is None:
+            raise ValueError(f"Planilha '{sheet_name}' não encontrada no arquivo")
+
+    destino = destinos[escolhida.get(f'{NS_REL}id')]
+    if destino.startswith('/'):
+        return destino.lstrip('/')
+    return posixpath.normpath(posixpath.join('xl', destino))
+
+
+def _ler_strings_compartilhadas(arquivo_zip):
+    if 'xl/sharedStrings.xml' not in arquivo_zip.namelist():
+        return []
+
+    strings = []
+    with arquivo_zip.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == f'{NS}si':
+                # Texto rico vem quebrado em vários <r><t>; o fonético (<rPh>) é ignorado
+                partes = []
+                for filho in elem:
+                    if filho.tag == f'{NS}t':
+                        partes.append(filho.text or '')
+                    elif filho.tag == f'{NS}r':
+                        partes.extend(t.text or '' for t in filho.iter(f'{NS}t'))
+                strings.append(''.join(partes))
+                elem.clear()
+    return strings
+
+
+def _estilos_data(arquivo_zip):
+    if 'xl/styles.xml' not in arquivo_zip.namelist():
+        return set()
+
+    estilos = ET.fromstring(arquivo_zip.read('xl/styles.xml'))
+    formatos_data = set(FORMATOS_DATA_NATIVOS)
+    for formato in estilos.iter(f'{NS}numFmt'):
+        codigo = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.', '', formato.get('formatCode', '')).lower()
+        if 'd' in codigo or 'y' in codigo or ('m' in codigo and 'h' not in codigo and 's' not in codigo):
+            formatos_data.add(int(formato.get('numFmtId')))
+
+    cell_xfs = estilos.find(f'{NS}cellXfs')
+    if cell_xfs is None:
+        return set()
+    return {i for i, xf in enumerate(cell_xfs.findall(f'{NS}xf')) if int(xf.get('numFmtId', 0)) in formatos_data}
+
+
+def _indice_coluna(referencia):
+    indice = 0
+    for letra in referencia:
+        if not letra.isalpha():
+            break
+        indice = indice * 26 + (ord(letra.upper()) - 64)
+    return indice - 1
+
+
+# VALOR DE UMA CÉLULA
+def _valor_celula(celula, strings):
+    tipo = celula.get('t', 'n')
+    if tipo == 'inlineStr':
+        return ''.join(t.text or '' for t in celula.iter(f'{NS}t'))
+
+    v = celula.find(f'{NS}v')
+    if v is None or v.text is None:
+        return None
+    texto = v.text
+
+    if tipo == 's':
+        return strings[int(texto)]
+    if tipo in ('str', 'd'):
+        return texto
+    if tipo == 'b':
+        return texto == '1'
+    if tipo == 'e':
+        return None
+    if texto.lstrip('-').isdigit():
+        return int(texto)
+    return float(texto)
+
+
+def _montar_bloco(cabecalho, linhas, colunas_data):
+    df = pd.DataFrame(linhas, columns=cabecalho)
+    for coluna in colunas_data:
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(pd.to_numeric(df[coluna], errors='coerce'), unit='D', origin=ORIGEM_EXCEL)
+    return normalizar_tipos(df)
+
+
+# LINHAS DA PLANILHA
+def _linhas_planilha(arquivo_zip, caminho_planilha, strings):
+    with arquivo_zip.open(caminho_planilha) as f:
+        sheet_data = None
+        for evento, elem in ET.iterparse(f, events=('start', 'end')):
+            if evento == 'start':
+                if elem.tag == f'{NS}sheetData':
+                    sheet_data = elem
+                continue
+            if elem.tag != f'{NS}row':
+                continue
+
+            valores = {}
+            estilos = {}
+            for posicao, celula in enumerate(elem.iter(f'{NS}c')):
+                referencia = celula.get('r')
+                indice = _indice_coluna(referencia) if referencia else posicao
+                valores[indice] = _valor_celula(celula, strings)
+                estilos[indice] = int(celula.get('s', 0))
+
+            # Libera a linha já processada para manter a memória constante
+            if sheet_data is not None:
+                sheet_data.clear()
+
+            yield valores, estilos
+
+
+def ler_filtros_exportacao(caminho, sheet_name=None, coluna_chave='Codigo Cliente'):
+    """Devolve os textos das linhas acima do cabeçalho (título e filtros do ERP)."""
+    with zipfile.ZipFile(caminho) as arquivo_zip:
+        caminho_planilha = _caminho_planilha(arquivo_zip, sheet_name)
+        strings = _ler_strings_compartilhadas(arquivo_zip)
+
+        textos = []
+        for valores, _ in _linhas_planilha(arquivo_zip, caminho_planilha, strings):
+            if coluna_chave in valores.values():
+                break
+            for valor in valores.values():
+                if isinstance(valor, str) and valor and valor not in textos:
+                    textos.append(valor)
+        return textos
+
+
+# LEITURA EM BLOCOS
+def ler_xlsx_em_blocos(caminho, sheet_name=None, tamanho_bloco=20000, colunas=None, coluna_chave='Codigo Cliente'):
+    """Lê a planilha em streaming, devolvendo DataFrames tipados de até `tamanho_bloco` linhas.
+
+    O cabeçalho é a primeira linha que contém `coluna_chave` (as exportações do ERP
+    trazem título e filtros antes dele) e a leitura para na linha de "Total Geral".
+    """
+    with zipfile.ZipFile(caminho) as arquivo_zip:
+        caminho_planilha = _caminho_planilha(arquivo_zip, sheet_name)
+        strings = _ler_strings_compartilhadas(arquivo_zip)
+        estilos_data = _estilos_data(arquivo_zip)
+
+        cabecalho = None
+        indices = None
+        colunas_data = set()
+        linhas = []
+
+        for valores, estilos in _linhas_planilha(arquivo_zip, caminho_planilha, strings):
+            if cabecalho is None:
+                if coluna_chave in valores.values():
+                    ordem = sorted(i for i, v in valores.items() if v not in (None, ''))
+                    nomes = [str(valores[i]).strip() for i in ordem]
+                    selecionadas = [(i, n) for i, n in zip(ordem, nomes) if colunas is None or n in colunas]
+                    indices = [i for i, _ in selecionadas]
+                    cabecalho = [n for _, n in selecionadas]
+                continue
+
+            if 'Total Geral' in valores.values():
+                # Rodapé da exportação: o que vem depois não é linha de venda
+                break
+            if all(valores.get(i) in (None, '') for i in indices):
+                continue
+
+            for i, nome in zip(indices, cabecalho):
+                if estilos.get(i) in estilos_data and isinstance(valores.get(i), (int, float)):
+                    colunas_data.add(nome)
+            linhas.append([valores.get(i) for i in indices])
+
+            if len(linhas) >= tamanho_bloco:
+                yield _montar_bloco(cabecalho, linhas, colunas_data)
+                linhas = []
+
+        if cabecalho is None:
+            raise ValueError(f"Cabeçalho com a coluna '{coluna_chave}' não encontrado em {caminho}")
+        if linhas:
+            yield _montar_bloco(cabecalho, linhas, colunas_data)
+
+
+def ler_xlsx(caminho, sheet_name=None, colunas=None, tamanho_bloco=20000):
+    blocos = list(ler_xlsx_em_blocos(caminho, sheet_name, tamanho_bloco, colunas))
+    return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=colunas)
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# NOTAS E SEGMENTOS DO RFV, CALCULADOS PARA A BASE INTEIRA DE UMA VEZ
+# Faixas fixas dos dashboards (calcular_rfv_individual)
+LIMITES_RECENCIA = [30, 90, 180, 365]       # até 30 dias = 5 ... acima de 365 = 1
+LIMITES_FREQUENCIA = [1, 3, 6, 12]          # 12 ou mais = 5 ... nenhuma = 1
+LIMITES_VALOR = [5000, 10000, 20000, 50000]  # R$ 50 mil ou mais = 5 ... abaixo de 5 mil = 1
+
+CLASSIFICACOES = np.array(['Cliente em Risco', 'Cliente Potencial', 'Cliente Leal', 'Cliente VIP'])
+SEGMENTOS = np.array(['Cliente em Risco', 'Cliente Médio', 'Cliente Valioso', 'Cliente Premium'])
+
+
+# TABELAS DE CONSULTA: a nota (ou a soma das notas) vira posição no array de rótulos
+def _tabela_classificacao():
+    r, f, v = np.meshgrid(np.arange(6), np.arange(6), np.arange(6), indexing='ij')
+    return np.select(
+        [(r == 5) & (f == 5) & (v == 5), (r >= 4) & (f >= 4), r >= 3],
+        [3, 2, 1],
+        0,
+    ).astype('int8')
+
+
+def _tabela_segmento():
+    # Soma das três notas (3 a 15): 13+ Premium, 10+ Valioso, 7+ Médio, abaixo Em Risco
+    return np.digitize(np.arange(16), [7, 10, 13]).astype('int8')
+
+
+TABELA_CLASSIFICACAO = _tabela_classificacao()  # [r, f, v] -> posição em CLASSIFICACOES
+TABELA_SEGMENTO = _tabela_segmento()            # [r + f + v] -> posição em SEGMENTOS
+
+
+# NOTAS
+def notas_faixas(valores, limites, crescente=True):
+    """Nota de 1 a len(limites) + 1 por limites fixos, com searchsorted.
+
+    crescente=True: valor igual ao limite já sobe de nota (frequência, valor).
+    crescente=False: menor é melhor e o limite ainda conta como a faixa melhor (recência).
+    """
+    valores = np.asarray(valores, dtype='float64')
+    if crescente:
+        return (1 + np.searchsorted(limites, valores, side='right')).astype('int8')
+    return (len(limites) + 1 - np.searchsorted(limites, valores, side='left')).astype('int8')
+
+
+def notas_quantis(valores, quantidade=5, por_posicao=False, crescente=True):
+    """Nota de 1 a `quantidade` por quantis, como pd.qcut, com np.quantile + searchsorted.
+
+    por_posicao=True reproduz o qcut sobre rank(method='first'): empates são
+    desfeitos pela ordem das linhas, então as faixas ficam sempre do mesmo tamanho.
+    """
+    valores = np.asarray(valores, dtype='float64')
+    if por_posicao:
+        posicoes = np.empty(len(valores), dtype='float64')
+        posicoes[np.argsort(valores, kind='stable')] = np.arange(1, len(valores) + 1)
+        valores = posicoes
+    limites = np.nanquantile(valores, np.linspace(0, 1, quantidade + 1)[1:-1])
+    faixa = np.searchsorted(limites, valores, side='left')
+    return (1 + faixa if crescente else quantidade - faixa).astype('int8')
+
+
+def score_rfv(r, f, v):
+    # Score como inteiro (ex.: 545); o texto só é montado na saída
+    return r.astype('int16') * 100 + f.astype('int16') * 10 + v.astype('int16')
+
+
+# SEGMENTAÇÃO
+def classificar(r, f, v):
+    return CLASSIFICACOES[TABELA_CLASSIFICACAO[r, f, v]]
+
+
+def segmentar(r, f, v):
+    return SEGMENTOS[TABELA_SEGMENTO[r.astype('int64') + f + v]]
+
+
+def pontuar_faixas(recencia, frequencia, valor):
+    """Notas por faixas fixas e a classificação dos dashboards (VIP, Leal, Potencial, Em Risco)."""
+    r = notas_faixas(recencia, LIMITES_RECENCIA, crescente=False)
+    f = notas_faixas(frequencia, LIMITES_FREQUENCIA)
+    v = notas_faixas(valor, LIMITES_VALOR)
+    return r, f, v, classificar(r, f, v)
+
+
+# BASE INTEIRA
+def agregar_rfv(linhas, chave='Codigo Cliente', hoje=None):
+    """Recência, frequência (linhas com pedido) e valor por `chave`, só com agregações nativas."""
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today())
+    grupos = linhas.groupby(chave, observed=True)
+    rfv = pd.DataFrame({
+        'Recencia': (hoje - grupos['Data Ultima Compra'].max()).dt.days,
+        'Frequencia': grupos['Numero Pedido'].count(),
+        'Valor': grupos['Vlr Venda'].sum(),
+    })
+    # Em ordem de código, como o groupby do RFV.py: o desempate do rank 'first' depende dela
+    rfv.index = rfv.index.astype(str)
+    return rfv.sort_index()
+
+
+def pontuar_quantis(rfv, quantidade=5):
+    """Notas por quintis (recência direta; frequência e valor pela posição) e o segmento pela soma."""
+    r = notas_quantis(rfv['Recencia'].to_numpy(), quantidade, crescente=False)
+    f = notas_quantis(rfv['Frequencia'].to_numpy(), quantidade, por_posicao=True)
+    v = notas_quantis(rfv['Valor'].to_numpy(), quantidade, por_posicao=True)
+    return com_notas(rfv, r, f, v)
+
+
+def com_notas(rfv, r, f, v):
+    # Colunas de saída do RFV.py a partir das três notas
+    return rfv.assign(
+        R_quantil=r,
+        F_quantil=f,
+        V_quantil=v,
+        RFV_Score=score_rfv(r, f, v).astype(str),
+        Segmento=segmentar(r, f, v),
+    )
+
+
+# Colunas que o RFV lê da base (para quem carrega só parte dela, como o armazém SQLite)
+COLUNAS_RFV = ['Codigo Cliente', 'Codigo Grupo Cliente', 'Data Cadastro', 'Data Ultima Compra', 'Numero Pedido', 'Vlr Venda']
+
+
+# ESQUEMAS: como cada app pontua (notas por faixas fixas ou por quintis da base)
+ESQUEMAS_RFV = {
+    # Dashboards: frequência = dias distintos com pedido; classificação VIP/Leal/Potencial/Em Risco
+    'faixas': {'notas': 'faixas', 'frequencia': 'dias'},
+    # RFV.py: frequência = linhas com pedido; segmento pela soma das notas
+    'quantis': {'notas': 'quantis', 'frequencia': 'linhas'},
+}
+
+
+def agregar_tabela_rfv(linhas, chave='Codigo Cliente', esquema='faixas'):
+    """Última compra, frequência (conforme o esquema) e valor por `chave`."""
+    grupos = linhas.groupby(chave, observed=True)
+    if ESQUEMAS_RFV[esquema]['frequencia'] == 'dias':
+        frequencia = grupos['Data Cadastro'].nunique()
+    else:
+        frequencia = grupos['Numero Pedido'].count()
+    tabela = pd.DataFrame({
+        'Ultima Compra': grupos['Data Ultima Compra'].max(),
+        'Frequencia': frequencia,
+        'Valor': grupos['Vlr Venda'].sum(),
+    })
+    tabela.index = tabela.index.astype(str)
+    return tabela
+
+
+def pontuar_tabela_rfv(tabela, esquema='faixas', hoje=None):
+    """Recência, notas, score e classificação sobre os agregados de agregar_tabela_rfv."""
+    hoje = pd.Timestamp(hoje or pd.Timestamp.today()).normalize()
+    tabela = tabela.assign(Recencia=(hoje - tabela['Ultima Compra']).dt.days.fillna(999).astype('int64'))
+
+    if ESQUEMAS_RFV[esquema]['notas'] == 'faixas':
+        r, f, v, classificacao = pontuar_faixas(tabela['Recencia'], tabela['Frequencia'], tabela['Valor'])
+    else:
+        r = notas_quantis(tabela['Recencia'].to_numpy(), crescente=False)
+        f = notas_quantis(tabela['Frequencia'].to_numpy(), por_posicao=True)
+        v = notas_quantis(tabela['Valor'].to_numpy(), por_posicao=True)
+        classificacao = segmentar(r, f, v)
+    return tabela.assign(R=r, F=f, V=v, Score=score_rfv(r, f, v), Classificacao=classificacao)
+
+
+def calcular_tabela_rfv(linhas, chave='Codigo Cliente', esquema='faixas', hoje=None):
+    """RFV de todas as chaves de uma vez, no esquema pedido, com a mesma saída nos dois."""
+    return pontuar_tabela_rfv(agregar_tabela_rfv(linhas, chave, esquema), esquema, hoje)
+
+
+# TABELA MATERIALIZADA, LIDA PELOS DASHBOARDS
+class TabelaRFV:
+    """RFV de todos os clientes e grupos, montado na carga; o card da análise é uma consulta por chave."""
+
+    def __init__(self, linhas, esquema='faixas', hoje=None, agregar=agregar_tabela_rfv):
+        # `agregar(linhas, chave, esquema)`: groupby em memória ou, no armazém SQLite, um GROUP BY
+        self.esquema = esquema
+        self.clientes = pontuar_tabela_rfv(agregar(linhas, 'Codigo Cliente', esquema), esquema, hoje)
+        self.grupos = pontuar_tabela_rfv(agregar(linhas, 'Codigo Grupo Cliente', esquema), esquema, hoje)
+
+    def linha(self, codigo_cliente=None, codigo_grupo=None):
+        # Cliente tem prioridade sobre grupo, como no filtro dos apps
+        tabela, codigo = (self.clientes, codigo_cliente) if codigo_cliente else (self.grupos, codigo_grupo)
+        posicao = tabela.index.get_indexer([str(codigo)])[0] if codigo else -1
+        return None if posicao < 0 else tabela.iloc[posicao]
+
+    def cartao(self, codigo_cliente=None, codigo_grupo=None):
+        """Mesmo dicionário que o calcular_rfv_individual dos apps montava a cada clique."""
+        linha = self.linha(codigo_cliente, codigo_grupo)
+        if linha is None:
+            return None
+        return {
+            'Recência (dias)': int(linha['Recencia']),
+            'Frequência (pedidos únicos)': int(linha['Frequencia']),
+            'Valor Total (R$)': f"{linha['Valor']:,.2f}",
+            'RFV Score': str(linha['Score']),
+            'Classificação': linha['Classificacao'],
+        }
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+from vetores import codigos_e_rotulos
+
+
+# SOMAS POR CÓDIGO (bincount nos códigos da categoria, sem groupby)
+def _somas(codigos, pesos, tamanho):
+    usar = codigos >= 0
+    somas = np.bincount(codigos[usar], weights=pesos[usar], minlength=tamanho)
+    presentes = np.bincount(codigos[usar], minlength=tamanho) > 0
+    return somas, presentes
+
+
+def _maiores(somas, presentes, k):
+    """Posições das k maiores somas, da maior para a menor (empate: menor código primeiro).
+
+    np.partition acha o k-ésimo maior em O(n) (seleção parcial); só os que o alcançam são ordenados.
+    """
+    candidatos = np.flatnonzero(presentes)
+    if len(candidatos) > k:
+        # Folga para o empate na fronteira: todos os que igualam o k-ésimo entram no desempate
+        corte = -np.partition(-somas[candidatos], k - 1)[k - 1]
+        candidatos = candidatos[somas[candidatos] >= corte]
+    ordem = np.lexsort((candidatos, -somas[candidatos]))
+    return candidatos[ordem][:k]
+
+
+def _medida(celulas, medida):
+    valores = np.nan_to_num(celulas[medida].to_numpy(dtype='float64'))
+    inteira = pd.api.types.is_integer_dtype(celulas[medida].dtype)
+    return valores, inteira
+
+
+def top_k(celulas, coluna, medida='Qtd Venda', k=10, acompanhar=()):
+    """As k maiores somas de `medida` por `coluna`, como groupby + sort_values + head(k).
+
+    `acompanhar` traz colunas que dependem só da chave (ex.: 'Linha' de 'Codigo Linha').
+    """
+    codigos, rotulos = codigos_e_rotulos(celulas[coluna])
+    valores, inteira = _medida(celulas, medida)
+    somas, presentes = _somas(codigos, valores, len(rotulos))
+    escolhidos = _maiores(somas, presentes, k)
+
+    top = pd.DataFrame({coluna: np.asarray(rotulos)[escolhidos]})
+    if acompanhar:
+        # Primeira linha de cada código escolhido
+        primeira = np.array([np.argmax(codigos == c) for c in escolhidos], dtype='int64')
+        for extra in acompanhar:
+            top[extra] = celulas[extra].to_numpy()[primeira]
+    top[medida] = somas[escolhidos].round().astype('int64') if inteira else somas[escolhidos]
+    return top
+
+
+# RANKING DE UM RECORTE COM DETALHE LINHA → REFERÊNCIA
+class RankingVendas:
+    """Linhas e, dentro de cada linha, referências de um recorte, já ordenadas pela medida.
+
+    Montado uma vez por análise (e guardado com ela no cache de análises): o top de
+    linhas e o detalhe de uma linha viram fatias de arrays prontos.
+    """
+
+    def __init__(self, dados, medida='Qtd Venda'):
+        self.medida = medida
+        linhas, self._rotulos_linha = codigos_e_rotulos(dados['Linha'])
+        referencias, self._rotulos_referencia = codigos_e_rotulos(dados['Referencia'])
+        valores, self._inteira = _medida(dados, medida)
+
+        somas_linha, presentes_linha = _somas(linhas, valores, len(self._rotulos_linha))
+        self._linhas = _maiores(somas_linha, presentes_linha, len(self._rotulos_linha))
+        self._somas_linha = somas_linha[self._linhas]
+
+        # Pares (linha, referência): uma soma por par, ordenados por linha e, dentro dela, pela soma
+        usar = (linhas >= 0) & (referencias >= 0)
+        pares, inverso = np.unique(linhas[usar] * len(self._rotulos_referencia) + referencias[usar], return_inverse=True)
+        somas_par = np.bincount(inverso, weights=valores[usar], minlength=len(pares))
+        linha_par, referencia_par = np.divmod(pares, len(self._rotulos_referencia))
+        ordem = np.lexsort((referencia_par, -somas_par, linha_par))
+        self._linha_par = linha_par[ordem]
+        self._referencia_par = referencia_par[ordem]
+        self._somas_par = somas_par[ordem]
+
+    def _valores(self, somas):
+        return somas.round().astype('int64') if self._inteira else somas
+
+    def linhas(self):
+        return list(np.asarray(self._rotulos_linha)[self._linhas])
+
+    def top_linhas(self, k=10):
+        return pd.DataFrame({
+            'Linha': np.asarray(self._rotulos_linha)[self._linhas[:k]],
+            self.medida: self._valores(self._somas_linha[:k]),
+        })
+
+    def top_referencias(self, linha, k=10):
+        codigo = self._rotulos_linha.get_indexer([linha])[0]
+        a = np.searchsorted(self._linha_par, codigo, side='left')
+        b = np.searchsorted(self._linha_par, codigo, side='right') if codigo >= 0 else a
+        b = min(b, a + k)
+        return pd.DataFrame({
+            'Referencia': np.asarray(self._rotulos_referencia)[self._referencia_par[a:b]],
+            self.medida: self._valores(self._somas_par[a:b]),
+        })
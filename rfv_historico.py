@@ -0,0 +1,178 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from agregacao_particionada import PASTA_RESUMOS, gravar_parquet
+from ingestao import PASTA_DATASET, carregar_dataset
+from motor_rfv import (
+    CLASSIFICACOES, LIMITES_FREQUENCIA, LIMITES_RECENCIA, LIMITES_VALOR,
+    TABELA_CLASSIFICACAO, notas_faixas, score_rfv,
+)
+from vetores import DIA, NAT, codigos_e_rotulos
+
+# RFV EM QUALQUER DATA ("COMO ESTAVA EM"), FOTOS MENSAIS E MIGRAÇÃO ENTRE SEGMENTOS
+COLUNAS_HISTORICO_RFV = ['Codigo Cliente', 'Data Cadastro', 'Vlr Venda']
+SEM_COMPRAS = 'Sem Compras'
+# Posição em CLASSIFICACOES; quem ainda não comprou na data fica na posição seguinte
+ROTULOS = np.append(CLASSIFICACOES, SEM_COMPRAS)
+ORDEM_SEGMENTOS = ['Cliente VIP', 'Cliente Leal', 'Cliente Potencial', 'Cliente em Risco', SEM_COMPRAS]
+
+_BITS_DIA = 20  # dias desde o primeiro pedido cabem em 20 bits (mais de 2.800 anos)
+
+
+def fins_de_mes(inicio, fim):
+    return pd.date_range(pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize(), freq='ME')
+
+
+class HistoricoRFV:
+    """Dias com pedido de cada cliente em arrays ordenados, com o valor acumulado.
+
+    O RFV de todos os clientes em várias datas sai de uma só busca binária sobre a
+    chave (cliente, dia): nada é reagrupado por data. Notas e classificação são as
+    das faixas fixas dos dashboards (motor_rfv); a recência conta da última
+    Data Cadastro até a data, não da Data Ultima Compra de hoje.
+    """
+
+    def __init__(self, linhas):
+        dias = linhas['Data Cadastro'].to_numpy(dtype='datetime64[ns]').view('int64')
+        codigos, clientes = codigos_e_rotulos(linhas['Codigo Cliente'])
+        self.clientes = clientes.astype(str)
+        usar = (dias != NAT) & (codigos >= 0)
+        dias = dias[usar] // DIA
+        codigos = codigos[usar]
+        valores = np.nan_to_num(linhas['Vlr Venda'].to_numpy(dtype='float64'))[usar]
+
+        self._dia0 = int(dias.min()) if len(dias) else 0
+        # Um ponto por (cliente, dia): a frequência das faixas conta dias com pedido
+        chaves, inverso = np.unique((codigos << _BITS_DIA) + (dias - self._dia0), return_inverse=True)
+        self._chaves = chaves
+        self._acumulado = np.r_[0.0, np.cumsum(np.bincount(inverso, weights=valores, minlength=len(chaves)))]
+        self._inicio = np.searchsorted(chaves, np.arange(len(self.clientes), dtype='int64') << _BITS_DIA)
+        self.primeira_data = pd.Timestamp(self._dia0 * DIA) if len(dias) else pd.NaT
+        self.ultima_data = pd.Timestamp((self._dia0 + int(chaves.max() & ((1 << _BITS_DIA) - 1))) * DIA) if len(dias) else pd.NaT
+
+    def _medir(self, datas):
+        """Recência, frequência, valor e posição da classificação: matrizes datas × clientes."""
+        datas = pd.DatetimeIndex(datas).normalize()
+        dias = np.clip(datas.asi8 // DIA - self._dia0, -1, (1 << _BITS_DIA) - 1)
+        consultas = (np.arange(len(self.clientes), dtype='int64') << _BITS_DIA)[None, :] + dias[:, None]
+        fim = np.searchsorted(self._chaves, consultas, side='right')
+        inicio = np.broadcast_to(self._inicio, fim.shape)
+
+        frequencia = fim - inicio
+        comprou = frequencia > 0
+        valor = self._acumulado[fim] - self._acumulado[inicio]
+        ultimo = np.where(comprou, self._chaves[np.maximum(fim - 1, 0)] & ((1 << _BITS_DIA) - 1), 0)
+        recencia = np.where(comprou, dias[:, None] - ultimo, 0)
+
+        r = notas_faixas(recencia, LIMITES_RECENCIA, crescente=False)
+        f = notas_faixas(frequencia, LIMITES_FREQUENCIA)
+        v = notas_faixas(valor, LIMITES_VALOR)
+        posicao = np.where(comprou, TABELA_CLASSIFICACAO[r, f, v], len(CLASSIFICACOES))
+        return {
+            'comprou': comprou, 'ultimo': ultimo, 'recencia': recencia, 'frequencia': frequencia,
+            'valor': valor, 'r': r, 'f': f, 'v': v, 'posicao': posicao,
+        }
+
+    def em(self, data):
+        """RFV de cada cliente que já tinha comprado em `data`, como a TabelaRFV daquele dia."""
+        medidas = {nome: valores[0] for nome, valores in self._medir([data]).items()}
+        usar = medidas['comprou']
+        r, f, v = medidas['r'][usar], medidas['f'][usar], medidas['v'][usar]
+        return pd.DataFrame({
+            'Ultima Compra': ((medidas['ultimo'][usar] + self._dia0) * DIA).astype('datetime64[ns]'),
+            'Frequencia': medidas['frequencia'][usar],
+            'Valor': medidas['valor'][usar],
+            'Recencia': medidas['recencia'][usar],
+            'R': r,
+            'F': f,
+            'V': v,
+            'Score': score_rfv(r, f, v),
+            'Classificacao': ROTULOS[medidas['posicao'][usar]],
+        }, index=pd.Index(self.clientes[usar], name='Codigo Cliente'))
+
+    def fotos_mensais(self, inicio=None, fim=None):
+        """Classificação de cada cliente no fim de cada mês: clientes × meses."""
+        meses = fins_de_mes(inicio or self.primeira_data, fim or self.ultima_data)
+        posicao = self._medir(meses)['posicao']
+        fotos = pd.DataFrame(ROTULOS[posicao.T], index=pd.Index(self.clientes, name='Codigo Cliente'), columns=meses)
+        return fotos.astype(pd.CategoricalDtype(ORDEM_SEGMENTOS))
+
+    def migracao(self, de, ate):
+        """Clientes por segmento em `de` (linhas) e em `ate` (colunas)."""
+        posicao = self._medir([de, ate])['posicao']
+        return _matriz(posicao[0], posicao[1])
+
+    def migracoes_mensais(self, inicio=None, fim=None):
+        """Migrações de cada mês para o seguinte, numa só passada: Mes, De, Para, Clientes."""
+        meses = fins_de_mes(inicio or self.primeira_data, fim or self.ultima_data)
+        posicao = self._medir(meses)['posicao']
+        k = len(ROTULOS)
+        passo = np.arange(len(meses) - 1)[:, None]
+        contagem = np.bincount(
+            (passo * k * k + posicao[:-1] * k + posicao[1:]).ravel(), minlength=max(len(meses) - 1, 0) * k * k
+        ).reshape(-1, k, k)
+        mes, de, para = np.nonzero(contagem)
+        return pd.DataFrame({
+            'Mes': meses[1:][mes],
+            'De': ROTULOS[de],
+            'Para': ROTULOS[para],
+            'Clientes': contagem[mes, de, para],
+        })
+
+
+def _matriz(origem, destino):
+    k = len(ROTULOS)
+    contagem = np.bincount(origem * k + destino, minlength=k * k).reshape(k, k)
+    matriz = pd.DataFrame(contagem, index=pd.Index(ROTULOS, name='De'), columns=pd.Index(ROTULOS, name='Para'))
+    return matriz.loc[ORDEM_SEGMENTOS, ORDEM_SEGMENTOS]
+
+
+def matriz_migracao(migracoes):
+    """Matriz De × Para a partir das linhas de migracoes_mensais (um mês ou a soma de vários)."""
+    matriz = migracoes.pivot_table(index='De', columns='Para', values='Clientes', aggfunc='sum', fill_value=0)
+    return matriz.reindex(index=ORDEM_SEGMENTOS, columns=ORDEM_SEGMENTOS, fill_value=0)
+
+
+# VISÃO MATERIALIZADA
+def gerar_historico_rfv(pasta=PASTA_DATASET, destino=PASTA_RESUMOS):
+    """Grava a classificação de fim de mês de cada cliente e as migrações mês a mês."""
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    historico = HistoricoRFV(carregar_dataset(pasta, colunas=COLUNAS_HISTORICO_RFV))
+
+    fotos = historico.fotos_mensais().rename_axis(columns='Mes').stack().rename('Classificacao').reset_index()
+    fotos = fotos[fotos['Classificacao'] != SEM_COMPRAS]
+    fotos['Classificacao'] = fotos['Classificacao'].astype(str)
+    gravar_parquet(fotos, destino / "rfv_mensal.parquet")
+
+    migracoes = historico.migracoes_mensais()
+    gravar_parquet(migracoes, destino / "rfv_migracoes.parquet")
+    return [('rfv_mensal', len(fotos)), ('rfv_migracoes', len(migracoes))]
+
+
+# LEITURA PELOS APPS
+def meses_migracao(pasta=PASTA_RESUMOS):
+    meses = ds.dataset(Path(pasta) / "rfv_migracoes.parquet").to_table(columns=['Mes']).column('Mes')
+    return sorted(pd.to_datetime(pd.unique(meses.to_pandas())), reverse=True)
+
+
+def migracao_do_mes(mes, pasta=PASTA_RESUMOS):
+    """Matriz De (fim do mês anterior) × Para (fim de `mes`)."""
+    migracoes = ds.dataset(Path(pasta) / "rfv_migracoes.parquet").to_table(
+        filter=ds.field('Mes') == pd.Timestamp(mes)
+    ).to_pandas()
+    return matriz_migracao(migracoes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera as fotos mensais do RFV e a migração entre segmentos")
+    parser.add_argument("--dataset", default=str(PASTA_DATASET))
+    parser.add_argument("--destino", default=str(PASTA_RESUMOS))
+    args = parser.parse_args()
+
+    for nome, linhas in gerar_historico_rfv(args.dataset, args.destino):
+        print(f"{nome}: {linhas} linhas")
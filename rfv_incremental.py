@@ -0,0 +1,191 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregacao_particionada import PASTA_RESUMOS, gravar_parquet
+from motor_rfv import com_notas, pontuar_quantis
+from vetores import NAT
+
+# RFV DO RFV.py MANTIDO PEDIDO A PEDIDO, SEM RELER O HISTÓRICO
+COLUNAS_RFV_INCREMENTAL = ['Codigo Cliente', 'Numero Pedido', 'Data Ultima Compra', 'Vlr Venda']
+ARQUIVO_PEDIDOS = "rfv_pedidos.parquet"
+ARQUIVO_CLIENTES = "rfv_clientes.parquet"
+ARQUIVO_CORTES = "rfv_cortes.json"
+SEM_PEDIDO = "SEM PEDIDO/"
+
+NOTAS = ['R_quantil', 'F_quantil', 'V_quantil']
+
+
+# AGREGADOS
+def parcial_pedidos(linhas):
+    # Um registro por pedido: a unidade que a ingestão incremental substitui.
+    # Sem cliente a linha fica fora, como no groupby do RFV.py
+    linhas = linhas[linhas['Codigo Cliente'].notna()]
+    clientes = linhas['Codigo Cliente'].astype(str)
+    # Linhas sem pedido não viram um pedido comum a todos: ficam numa chave própria de cada
+    # cliente, contam no valor e na última compra, mas não na frequência
+    pedidos = linhas['Numero Pedido'].astype(str).where(linhas['Numero Pedido'].notna(), SEM_PEDIDO + clientes)
+    grupos = linhas.groupby(pedidos.rename('Numero Pedido'))
+    return pd.DataFrame({
+        'Codigo Cliente': clientes.groupby(pedidos.rename('Numero Pedido')).first(),
+        'Ultima Compra': grupos['Data Ultima Compra'].max(),
+        'Linhas': grupos['Numero Pedido'].count(),
+        'Valor': grupos['Vlr Venda'].sum(),
+    })
+
+
+def agregar_clientes(pedidos):
+    # Frequência como no RFV.py: linhas com pedido, não pedidos distintos
+    grupos = pedidos.groupby('Codigo Cliente')
+    return pd.DataFrame({
+        'Ultima Compra': grupos['Ultima Compra'].max(),
+        'Frequencia': grupos['Linhas'].sum(),
+        'Valor': grupos['Valor'].sum(),
+    })
+
+
+# CORTES DAS NOTAS
+def _eixos(clientes):
+    """Valores em que cada nota cresce. A recência vai pela data da última compra:
+    os cortes em data não envelhecem com o passar dos dias, como os cortes em dias fariam."""
+    ultima = clientes['Ultima Compra'].to_numpy(dtype='datetime64[ns]').view('int64')
+    return {
+        'R_quantil': np.where(ultima == NAT, -np.inf, ultima.astype('float64')),
+        'F_quantil': clientes['Frequencia'].to_numpy(dtype='float64'),
+        'V_quantil': clientes['Valor'].to_numpy(dtype='float64'),
+    }
+
+
+def _cortes(valores, notas, quantidade):
+    # Menor valor com nota >= k (k = 2..quantidade): quem o alcança já está na faixa k
+    menores = np.full(quantidade + 1, np.inf)
+    np.minimum.at(menores, notas.astype('int64'), valores)
+    return np.minimum.accumulate(menores[::-1])[::-1][2:]
+
+
+def _notas(valores, cortes):
+    return (1 + np.searchsorted(cortes, valores, side='right')).astype('int8')
+
+
+def _parcelas(valores, cortes):
+    # Fração dos clientes abaixo de cada corte
+    if not len(valores):
+        return np.zeros(len(cortes))
+    return (valores[:, None] < cortes[None, :]).mean(axis=0)
+
+
+# MANUTENÇÃO INCREMENTAL
+class RFVIncremental:
+    """RFV por quintis do RFV.py, atualizado só com os pedidos novos ou corrigidos.
+
+    Um lote reagrega só os clientes que ele toca e os pontua nos cortes vigentes.
+    As notas da base inteira são refeitas, como no RFV.py, quando a fração de clientes
+    abaixo de algum corte se desloca mais que `tolerancia` desde a última reclassificação.
+    """
+
+    def __init__(self, quantidade=5, tolerancia=0.02):
+        self.quantidade = quantidade
+        self.tolerancia = tolerancia
+        self.pedidos = None
+        self.clientes = None
+        self.cortes = None
+        self.parcelas = None
+
+    def aplicar(self, linhas, hoje=None):
+        """Aplica as linhas de venda de um lote; um pedido que volta substitui a versão anterior."""
+        delta = parcial_pedidos(linhas)
+        if delta.empty:
+            return {'pedidos': 0, 'clientes': 0, 'reclassificado': False}
+
+        if self.cortes is None:
+            # Primeiro lote: nada a substituir, a base inteira é pontuada
+            self.pedidos = delta
+            self.clientes = agregar_clientes(delta)
+            self.reclassificar(hoje)
+            return {'pedidos': len(delta), 'clientes': len(self.clientes), 'reclassificado': True}
+
+        # Os clientes do pedido antes e depois da correção são reagregados
+        substituidos = self.pedidos.index.isin(delta.index)
+        tocados = pd.Index(delta['Codigo Cliente'].unique()).union(self.pedidos.loc[substituidos, 'Codigo Cliente'].unique())
+        self.pedidos = pd.concat([self.pedidos[~substituidos], delta])
+        atualizados = agregar_clientes(self.pedidos[self.pedidos['Codigo Cliente'].isin(tocados)])
+
+        eixos = _eixos(atualizados)
+        for nota in NOTAS:
+            atualizados[nota] = _notas(eixos[nota], self.cortes[nota])
+        # Cliente que perdeu todos os pedidos sai da tabela, como sairia no RFV.py
+        self.clientes = pd.concat([self.clientes[~self.clientes.index.isin(tocados)], atualizados]).sort_index()
+
+        reclassificar = self.deriva() > self.tolerancia
+        if reclassificar:
+            self.reclassificar(hoje)
+        return {'pedidos': len(delta), 'clientes': len(tocados), 'reclassificado': reclassificar}
+
+    def deriva(self):
+        """Maior deslocamento, em fração da base, de um corte desde a última reclassificação."""
+        eixos = _eixos(self.clientes)
+        return max(
+            float(np.max(np.abs(_parcelas(eixos[nota], self.cortes[nota]) - self.parcelas[nota]), initial=0))
+            for nota in NOTAS
+        )
+
+    def reclassificar(self, hoje=None):
+        # Mesmas notas que o RFV.py daria para a base inteira hoje
+        notas = pontuar_quantis(self._rfv(hoje), self.quantidade)
+        eixos = _eixos(self.clientes)
+        self.cortes, self.parcelas = {}, {}
+        for nota in NOTAS:
+            self.clientes[nota] = notas[nota].to_numpy()
+            self.cortes[nota] = _cortes(eixos[nota], self.clientes[nota].to_numpy(), self.quantidade)
+            self.parcelas[nota] = _parcelas(eixos[nota], self.cortes[nota])
+
+    def _rfv(self, hoje=None):
+        hoje = pd.Timestamp(hoje or pd.Timestamp.today())
+        return pd.DataFrame({
+            'Recencia': (hoje - self.clientes['Ultima Compra']).dt.days,
+            'Frequencia': self.clientes['Frequencia'],
+            'Valor': self.clientes['Valor'],
+        })
+
+    def tabela(self, hoje=None):
+        """Mesmas colunas que o RFV.py exporta, com as notas mantidas."""
+        r, f, v = (self.clientes[nota].to_numpy() for nota in NOTAS)
+        return com_notas(self._rfv(hoje), r, f, v)
+
+    # PERSISTÊNCIA
+    def salvar(self, pasta=PASTA_RESUMOS):
+        pasta = Path(pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+        if self.cortes is None:
+            raise ValueError("RFV incremental vazio: aplique um lote antes de salvar")
+        gravar_parquet(self.pedidos.reset_index(), pasta / ARQUIVO_PEDIDOS)
+        gravar_parquet(self.clientes.reset_index(), pasta / ARQUIVO_CLIENTES)
+        # Os cortes por último: sem eles, a próxima abertura começa do zero
+        estado = {
+            'quantidade': self.quantidade,
+            'tolerancia': self.tolerancia,
+            'cortes': {nota: cortes.tolist() for nota, cortes in self.cortes.items()},
+            'parcelas': {nota: parcelas.tolist() for nota, parcelas in self.parcelas.items()},
+        }
+        caminho = pasta / ARQUIVO_CORTES
+        temporario = caminho.with_name(f".{caminho.name}.{os.getpid()}.tmp")
+        temporario.write_text(json.dumps(estado, indent=2), encoding="utf-8")
+        os.replace(temporario, caminho)
+
+
+def abrir_rfv_incremental(pasta=PASTA_RESUMOS, quantidade=5, tolerancia=0.02):
+    """O RFV salvo em `pasta` ou, se ainda não houver, um vazio (o primeiro lote pontua tudo)."""
+    pasta = Path(pasta)
+    if not all((pasta / nome).exists() for nome in (ARQUIVO_PEDIDOS, ARQUIVO_CLIENTES, ARQUIVO_CORTES)):
+        return RFVIncremental(quantidade, tolerancia)
+
+    estado = json.loads((pasta / ARQUIVO_CORTES).read_text(encoding="utf-8"))
+    rfv = RFVIncremental(estado['quantidade'], estado['tolerancia'])
+    rfv.pedidos = pd.read_parquet(pasta / ARQUIVO_PEDIDOS).set_index('Numero Pedido')
+    rfv.clientes = pd.read_parquet(pasta / ARQUIVO_CLIENTES).set_index('Codigo Cliente')
+    rfv.cortes = {nota: np.array(cortes) for nota, cortes in estado['cortes'].items()}
+    rfv.parcelas = {nota: np.array(parcelas) for nota, parcelas in estado['parcelas'].items()}
+    return rfv
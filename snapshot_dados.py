@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from colunas_derivadas import aplicar_derivadas
+from esquema import aplicar_esquema, esquema_arrow
+from leitor_xlsx import ler_xlsx_em_blocos
+
+# PASTA ONDE FICAM OS SNAPSHOTS PARQUET
+PASTA_SNAPSHOT = Path(__file__).resolve().parent / ".snapshot"
+# Mude quando o conteúdo gravado mudar (colunas derivadas, tipos) para forçar a reconstrução
+VERSAO_SNAPSHOT = 4
+
+
+# ASSINATURA DO ARQUIVO DE ORIGEM
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def assinatura_arquivo(caminho):
+    info = os.stat(caminho)
+    return {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+# SNAPSHOT
+def _caminhos_snapshot(caminho_xlsx, sheet_name, pasta):
+    origem = Path(caminho_xlsx).resolve()
+    chave = hashlib.sha1(f"{origem}|{sheet_name}".encode("utf-8")).hexdigest()[:10]
+    base = Path(pasta) / f"{origem.stem}_{chave}"
+    return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+
+def _gravar_json(caminho, dados):
+    temporario = caminho.with_suffix(".json.tmp")
+    temporario.write_text(json.dumps(dados), encoding="utf-8")
+    os.replace(temporario, caminho)
+
+
+def snapshot_atualizado(caminho_xlsx, sheet_name='DADOS PREDITIVA', pasta=PASTA_SNAPSHOT):
+    caminho_parquet, caminho_meta = _caminhos_snapshot(caminho_xlsx, sheet_name, pasta)
+    if not caminho_parquet.exists() or not caminho_meta.exists():
+        return False
+
+    meta = json.loads(caminho_meta.read_text(encoding="utf-8"))
+    if meta.get('versao') != VERSAO_SNAPSHOT:
+        return False
+    assinatura = assinatura_arquivo(caminho_xlsx)
+    if meta.get('tamanho') == assinatura['tamanho'] and meta.get('mtime_ns') == assinatura['mtime_ns']:
+        return True
+
+    # mtime mudou (cópia, sincronização do Drive): só reconstrói se o conteúdo mudou
+    if meta.get('sha256') == hash_arquivo(caminho_xlsx):
+        meta.update(assinatura)
+        _gravar_json(caminho_meta, meta)
+        return True
+    return False
+
+
+def gerar_snapshot(caminho_xlsx, sheet_name='DADOS PREDITIVA', pasta=PASTA_SNAPSHOT):
+    caminho_parquet, caminho_meta = _caminhos_snapshot(caminho_xlsx, sheet_name, pasta)
+    caminho_parquet.parent.mkdir(parents=True, exist_ok=True)
+
+    assinatura = assinatura_arquivo(caminho_xlsx)
+    temporario = caminho_parquet.with_suffix(".parquet.tmp")
+
+    # Grava bloco a bloco: o pico de memória fica no tamanho de um bloco, não da planilha
+    linhas = 0
+    escritor = None
+    try:
+        for bloco in ler_xlsx_em_blocos(caminho_xlsx, sheet_name=sheet_name):
+            bloco = aplicar_derivadas(bloco)
+            if escritor is None:
+                esquema = esquema_arrow(bloco.columns)
+                escritor = pq.ParquetWriter(temporario, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+            linhas += len(bloco)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:
+        raise ValueError(f"Nenhuma linha de dados encontrada em {caminho_xlsx}")
+    os.replace(temporario, caminho_parquet)
+
+    _gravar_json(caminho_meta, {
+        **assinatura,
+        'versao': VERSAO_SNAPSHOT,
+        'sha256': hash_arquivo(caminho_xlsx),
+        'origem': str(Path(caminho_xlsx).resolve()),
+        'sheet_name': sheet_name,
+        'linhas': linhas,
+    })
+    return caminho_parquet
+
+
+def carregar_snapshot(caminho_xlsx, sheet_name='DADOS PREDITIVA', pasta=PASTA_SNAPSHOT, colunas=None):
+    caminho_parquet, _ = _caminhos_snapshot(caminho_xlsx, sheet_name, pasta)
+    if not snapshot_atualizado(caminho_xlsx, sheet_name, pasta):
+        gerar_snapshot(caminho_xlsx, sheet_name, pasta)
+    return aplicar_esquema(pd.read_parquet(caminho_parquet, columns=colunas))
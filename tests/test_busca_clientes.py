@@ -0,0 +1,23 @@
+import pandas as pd
+
+from busca_clientes import SEM_GRUPO, BuscaClientes
+
+
+def _busca():
+    return BuscaClientes(pd.DataFrame({
+        'Codigo Cliente': ['10002', '10003', '20001'],
+        'Razao Social': ['CALCADOS ITAPUA S/A - LOJA 3', 'CALCADOS ITAPUA S/A - LOJA 4', 'SAPATARIA BRASIL LTDA'],
+        'Codigo Grupo Cliente': ['55', '55', SEM_GRUPO],
+        'Grupo Cliente': ['ITAPUA', 'ITAPUA', SEM_GRUPO],
+    }))
+
+
+def test_transposicao_ainda_encontra():
+    rotulos = [e['rotulo'] for e in _busca().buscar('itpaua')]
+    assert 'Grupo 55 - ITAPUA' in rotulos
+    assert any(r.startswith('Cliente 10002') for r in rotulos)
+    assert not any('SAPATARIA' in r for r in rotulos)
+
+
+def test_prefixo_de_codigo_vem_primeiro():
+    assert _busca().buscar('1000')[0]['codigo'] == '10002'
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from dados_compartilhados import mapear_arrow, publicar_arrow
+
+
+@pytest.fixture
+def compartilhado(tmp_path):
+    df = pd.DataFrame({
+        'Codigo Cliente': pd.Categorical(['20', '10', '30']),
+        'Vlr Venda': [3.0, 1.0, 2.0],
+    })
+    caminho = tmp_path / "vendas.arrow"
+    publicar_arrow(df, caminho)
+    return mapear_arrow(caminho)
+
+
+@pytest.mark.parametrize('alterar', [
+    lambda df: df.drop(columns=['Vlr Venda'], inplace=True),
+    lambda df: df.rename(columns={'Vlr Venda': 'Valor'}, inplace=True),
+    lambda df: df.sort_values('Vlr Venda', inplace=True),
+    lambda df: df.reset_index(drop=True, inplace=True),
+    lambda df: df.__setitem__('Vlr Venda', 0.0),
+    lambda df: setattr(df, 'columns', ['a', 'b']),
+    lambda df: setattr(df, 'Vlr Venda', 0.0),
+])
+def test_recusa_alteracoes_no_lugar(compartilhado, alterar):
+    antes = pd.DataFrame(compartilhado).copy()
+    with pytest.raises(TypeError):
+        alterar(compartilhado)
+    pd.testing.assert_frame_equal(pd.DataFrame(compartilhado), antes)
+
+
+def test_operacoes_que_geram_frame_novo_continuam_livres(compartilhado):
+    ordenado = compartilhado.sort_values('Vlr Venda')
+    ordenado['Dobro'] = ordenado['Vlr Venda'] * 2
+    assert list(ordenado['Codigo Cliente']) == ['10', '30', '20']
+    assert list(compartilhado['Codigo Cliente']) == ['20', '10', '30']
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from esquema import CODIGO_AUSENTE, normalizar_tipos
+
+
+def test_cliente_e_grupo_sem_codigo_viram_texto():
+    df = normalizar_tipos(pd.DataFrame({
+        'Codigo Cliente': [10002.0, None, np.nan],
+        'Codigo Grupo Cliente': [None, '55', 7.0],
+        'Numero Pedido': [None, '1', 2.0],
+    }))
+    assert df['Codigo Cliente'].tolist() == ['10002', CODIGO_AUSENTE, CODIGO_AUSENTE]
+    assert df['Codigo Grupo Cliente'].tolist() == [CODIGO_AUSENTE, '55', '7']
+    # Pedido sem número continua nulo: não pode virar um pedido comum a várias linhas
+    assert df['Numero Pedido'].isna().tolist() == [True, False, False]
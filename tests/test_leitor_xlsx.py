@@ -0,0 +1,20 @@
+from openpyxl import Workbook
+
+from leitor_xlsx import ler_xlsx_em_blocos
+
+
+def test_leitura_para_no_total_geral(tmp_path):
+    planilha = Workbook()
+    folha = planilha.active
+    folha.append(['Relatório de vendas'])
+    folha.append(['Codigo Cliente', 'Vlr Venda'])
+    folha.append(['10', 5.0])
+    folha.append([None, None])
+    folha.append(['20', 7.0])
+    folha.append(['Total Geral', 12.0])
+    folha.append(['30', 99.0])
+    caminho = tmp_path / "exportacao.xlsx"
+    planilha.save(caminho)
+
+    linhas = [linha for bloco in ler_xlsx_em_blocos(caminho) for linha in bloco.itertuples(index=False)]
+    assert [tuple(linha) for linha in linhas] == [('10', 5.0), ('20', 7.0)]
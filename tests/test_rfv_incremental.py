@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from motor_rfv import agregar_rfv
+from rfv_incremental import RFVIncremental, parcial_pedidos
+
+HOJE = pd.Timestamp('2025-04-15')
+
+
+def _linhas():
+    return pd.DataFrame({
+        'Codigo Cliente': ['10', '10', '20', '20', '30', None],
+        'Numero Pedido': ['1', None, None, '2', '3', '4'],
+        'Data Ultima Compra': pd.to_datetime(
+            ['2025-01-10', '2025-02-01', '2025-03-01', '2025-03-05', '2024-12-01', '2025-01-01']
+        ),
+        'Vlr Venda': [100.0, 50.0, 30.0, 200.0, 80.0, 999.0],
+    })
+
+
+def test_pedidos_nulos_ficam_com_o_proprio_cliente():
+    pedidos = parcial_pedidos(_linhas())
+    sem_pedido = pedidos[pedidos['Linhas'] == 0]
+    assert sorted(sem_pedido['Codigo Cliente']) == ['10', '20']
+    assert sem_pedido['Valor'].sum() == 80.0
+
+
+def test_frequencia_e_valor_como_no_rfv_completo():
+    linhas = _linhas()
+    rfv = RFVIncremental()
+    rfv.aplicar(linhas, HOJE)
+    referencia = agregar_rfv(linhas, hoje=HOJE)
+
+    tabela = rfv.tabela(HOJE).loc[referencia.index]
+    np.testing.assert_array_equal(tabela['Frequencia'], referencia['Frequencia'])
+    np.testing.assert_allclose(tabela['Valor'], referencia['Valor'])
+    np.testing.assert_array_equal(tabela['Recencia'], referencia['Recencia'])
+
+    # Reaplicar o mesmo lote não muda as medidas
+    rfv.aplicar(linhas, HOJE)
+    medidas = ['Recencia', 'Frequencia', 'Valor']
+    pd.testing.assert_frame_equal(rfv.tabela(HOJE).loc[referencia.index, medidas], tabela[medidas])
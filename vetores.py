@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+# CÓDIGOS E DATAS COMO INTEIROS, PARA AS CONTAS VETORIZADAS
+NAT = np.iinfo(np.int64).min  # NaT de uma coluna datetime64[ns] vista como int64
+DIA = 86_400 * 10**9          # um dia em nanossegundos
+
+
+def codigos_e_rotulos(serie):
+    """Código inteiro de cada linha (-1 = nulo) e os rótulos: as categorias ou os valores distintos."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype('int64'), serie.cat.categories
+    valores, rotulos = pd.factorize(serie)
+    return valores.astype('int64'), pd.Index(rotulos)